@@ -45,6 +45,22 @@ Shows the solution to the output
 """
 SHOW_SOLUTION_DEFAULT = True
 
+# Loading related
+"""
+Uses the compiled wordlist cache to avoid parsing the wordlist in each run
+"""
+WORDLIST_CACHE_DEFAULT = True
+
+"""
+Memory-maps the compiled wordlist cache so solver processes share the wordlist
+"""
+WORDLIST_MMAP_DEFAULT = False
+
+"""
+Folds diacritics of the wordlist letters (removes accents and other marks)
+"""
+WORDLIST_FOLD_DEFAULT = False
+
 # Algorithm variations
 """
 Chooses the simple implementation of the backtracking algorithm
@@ -61,11 +77,31 @@ Chooses the backtracking forwardchecking algorithm with live prints
 """
 ALG_BACKTRACKING_LIVE = "live"
 
+"""
+Chooses the backtracking algorithm maintaining arc consistency
+"""
+ALG_BACKTRACKING_MAC = "mac"
+
 """
 Default algorithm
 """
 ALG_DEFAULT = ALG_BACKTRACKING_FC
 
+"""
+Enforces arc consistency in the domains of the variables before searching
+"""
+ARC_CONSISTENCY_DEFAULT = True
+
+"""
+Directory to store the solutions found and reuse them (None to not store them)
+"""
+SOLUTIONS_DEFAULT = None
+
+"""
+Number of processes solving the independent parts of the crossword
+"""
+JOBS_DEFAULT = 1
+
 # Profiling
 """
 Show timers
@@ -1,5 +1,6 @@
 import argparse
 import ast
+import os
 from .constants import *
 import cli.printers.crossword as crossword_printer
 
@@ -7,6 +8,14 @@ import cli.printers.crossword as crossword_printer
 def evalTF(string):
 	return ast.literal_eval(string.title())
 
+def evalSeed(string):
+	variable, _, word = string.partition("=")
+	orient = {"H":ORIENT_HOR,"V":ORIENT_VER}.get(variable[:1].upper())
+	if orient is None or not variable[1:].isdigit() or not word:
+		raise argparse.ArgumentTypeError("%s is not a seed word like "%string
+			+"H1=WORD or V12=WORD")
+	return orient, int(variable[1:]), word
+
 # Default parser
 DEFAULT_PARSER = argparse.ArgumentParser(
 	# prog = 'crossword.py'
@@ -55,11 +64,64 @@ DEFAULT_PARSER.add_argument("-w","--wordlist",
 	action="store",
 	nargs="?",
 	help="""specifies the wordlist file to use to solve the crossword. It has
-	to be a file with a word per line, all uppercase or lowercase. Default is
-	%s"""%(ITEMSET_DEFAULT["wordlist"]),
+	to be a file with a word per line, all uppercase or lowercase, optionally
+	followed by a tabulation and its weight (more likely words are tried
+	first). Default is %s"""%(ITEMSET_DEFAULT["wordlist"]),
+	type=str,
+	default=None
+)
+DEFAULT_PARSER.add_argument("--overlay",
+	metavar="filename",
+	action="append",
+	help="""specifies a wordlist file whose words are added to the wordlist
+	(words already in it take the weights of this file, if it has). Can be
+	repeated to add several files""",
 	type=str,
 	default=None
 )
+DEFAULT_PARSER.add_argument("--exclude",
+	metavar="filename",
+	action="append",
+	help="""specifies a wordlist file whose words are removed from the
+	wordlist. Can be repeated to remove the words of several files""",
+	type=str,
+	default=None
+)
+DEFAULT_PARSER.add_argument("--cache",
+	metavar="true|false",
+	action="store",
+	nargs="?",
+	help="""enables or disables the compiled wordlist and crossword caches,
+	stored next to their files and rebuilt when the files change (%s by
+	default)"""%(
+	"enabled" if WORDLIST_CACHE_DEFAULT else "disabled"),
+	type=evalTF,
+	const=True,
+	default=WORDLIST_CACHE_DEFAULT
+)
+DEFAULT_PARSER.add_argument("--mmap",
+	metavar="true|false",
+	action="store",
+	nargs="?",
+	help="""enables or disables memory-mapping the compiled wordlist cache, so
+	all the processes solving with the same wordlist share a single copy of it
+	in memory. Implies using the cache (%s by default)"""%(
+	"enabled" if WORDLIST_MMAP_DEFAULT else "disabled"),
+	type=evalTF,
+	const=True,
+	default=WORDLIST_MMAP_DEFAULT
+)
+DEFAULT_PARSER.add_argument("--fold",
+	metavar="true|false",
+	action="store",
+	nargs="?",
+	help="""enables or disables folding the diacritics of the wordlist letters,
+	so accented letters are treated as the plain letter (%s by default)"""%(
+	"enabled" if WORDLIST_FOLD_DEFAULT else "disabled"),
+	type=evalTF,
+	const=True,
+	default=WORDLIST_FOLD_DEFAULT
+)
 DEFAULT_PARSER.add_argument("-c","--crossword",
 	metavar="filename",
 	action="store",
@@ -71,6 +133,17 @@ DEFAULT_PARSER.add_argument("-c","--crossword",
 	type=str,
 	default=None
 )
+DEFAULT_PARSER.add_argument("--seed",
+	metavar="variable=word",
+	action="append",
+	help="""pre-fills a variable of the crossword with a word, like H1=WORD for
+	the horizontal variable 1 or V12=WORD for the vertical variable 12, so the
+	solution must have it. Can be repeated to pre-fill several variables.
+	Letters can also be pre-filled in the crossword file, writing them in the
+	cells (after the number in numbered cells, like 12A)""",
+	type=evalSeed,
+	default=None
+)
 DEFAULT_PARSER.add_argument("--solution",
 	metavar="true|false",
 	action="store",
@@ -93,12 +166,48 @@ DEFAULT_PARSER.add_argument("--algorithm",
 	nargs="?",
 	help="""specifies the algorithm implementation to use. Use %s to show """
 	"""how the variables go assigning while algorithm runs. Live algorithm"""
-	"""uses the fastest algorithm found. (default is %s)"""%\
-		(ALG_BACKTRACKING_LIVE,ALG_DEFAULT),
+	"""uses the fastest algorithm found. Use %s to keep the domains arc """
+	"""consistent after each assignment, for big crosswords (default is """
+	"""%s)"""%(ALG_BACKTRACKING_LIVE,ALG_BACKTRACKING_MAC,ALG_DEFAULT),
 	type=str,
-	choices=[ALG_BACKTRACKING_FC,ALG_BACKTRACKING_SIMPLE,ALG_BACKTRACKING_LIVE],
+	choices=[ALG_BACKTRACKING_FC,ALG_BACKTRACKING_SIMPLE,ALG_BACKTRACKING_LIVE,
+		ALG_BACKTRACKING_MAC],
 	default=ALG_DEFAULT
 )
+DEFAULT_PARSER.add_argument("--arc-consistency",
+	metavar="true|false",
+	action="store",
+	nargs="?",
+	help="""enables or disables removing before searching, with any algorithm,
+	the words that can't be part of a solution because no word of a crossed
+	variable has the same letter in the crossing (%s by default)"""%(
+	"enabled" if ARC_CONSISTENCY_DEFAULT else "disabled"),
+	type=evalTF,
+	const=True,
+	default=ARC_CONSISTENCY_DEFAULT
+)
+DEFAULT_PARSER.add_argument("--solutions",
+	metavar="directory",
+	action="store",
+	nargs="?",
+	help="""specifies a directory to store the solutions found, so crosswords
+	with the same grid (even if numbered differently) solved with the same
+	wordlist get their stored solution instead of being solved again. Not used
+	by the %s algorithm (disabled by default)"""%ALG_BACKTRACKING_LIVE,
+	type=str,
+	default=SOLUTIONS_DEFAULT
+)
+DEFAULT_PARSER.add_argument("--jobs","-j",
+	metavar="number",
+	action="store",
+	nargs="?",
+	help="""number of processes that solve at the same time the parts of the
+	crossword that share no cells, each one solved on its own (one per CPU if
+	no number is given, %d by default)"""%JOBS_DEFAULT,
+	type=int,
+	const=os.cpu_count() or JOBS_DEFAULT,
+	default=JOBS_DEFAULT
+)
 DEFAULT_PARSER.add_argument("--play","-p",
 	action="store_const",
 	help="""sets play mode: we'll find the solution and give you definitions so
@@ -49,9 +49,10 @@ class CrosswordPrinter(object):
 	@attr 	_board 		the array containing ASCII values
 	@attr 	_presp 		spaces to add to each line to center the crossword
 	@attr 	_isPrinting controls whether the printer is ready to be updated
+	@attr 	_alphabet 	letters of the wordlist, to decode the letter codes
 	"""
 	__slots__ = ["_crossword","_period","_lastTime","_charset","_emptycell","_spacing",
-	"_board","_isPrinting","_presp"]
+	"_board","_isPrinting","_presp","_alphabet"]
 
 	"""
 	Initializes a new printer given the crossword object
@@ -59,9 +60,12 @@ class CrosswordPrinter(object):
 	@param 	crossword 	crossword object to use
 	@pram 	frames 		number of frames to print the crossword per second
 						set to <=0 to always print
+	@param 	alphabet 	alphabet of the wordlist, where each letter is in the
+						position of its code (if None, codes are code points)
 	"""
-	def __init__(self, crossword,frames=FRAMES_DEFAULT):
+	def __init__(self, crossword,frames=FRAMES_DEFAULT,alphabet=None):
 		self._crossword = crossword
+		self._alphabet = alphabet
 		self._period = 1.0/frames if frames > 0 else 0
 		self._lastTime = 0
 		self._charset = CHAR_TABLESETS_DEFAULT
@@ -83,7 +87,7 @@ class CrosswordPrinter(object):
 	"""
 	def setupBoard(self):
 		self._board = np.chararray((self._crossword.getRows(),
-			self._crossword.getCols()))
+			self._crossword.getCols()),itemsize=4)
 		self._board[:] = constants.CROSSWORD_CELL_EMPTY
 		# fill with variables
 		for var in self._crossword.getVariables():
@@ -94,6 +98,26 @@ class CrosswordPrinter(object):
 			else:
 				self._board[:,var[3][1]][var[3][0]:var[3][0]+var[0]] = word
 
+	"""
+	Shows in the board the letter of the cells that can only have one letter,
+	instead of the unknown value
+
+	@param 	candidates 	list with the mask of the letters each position of
+						each variable can have
+	"""
+	def setCandidates(self,candidates):
+		for var, masks in zip(self._crossword.getVariables(),candidates):
+			for i, mask in enumerate(masks.tolist()):
+				if not mask or mask & (mask-1):
+					continue
+				letter = mask.bit_length()-1
+				char = self._alphabet[letter] if self._alphabet is not None \
+					else chr(letter)
+				if var[1] == constants.ORIENT_HOR:
+					self._board[var[3][0],var[3][1]+i] = char.encode("utf-8")
+				else:
+					self._board[var[3][0]+i,var[3][1]] = char.encode("utf-8")
+
 	"""
 	Starts the printer, printing the initial empty crossword that will be
 	filled and storing the cursor position
@@ -131,7 +155,8 @@ class CrosswordPrinter(object):
 			2+variable[3][1]*4+self._presp))
 		# write variable
 		for i in range(variable[0]):
-			sys.stdout.write(chr(value[i]))
+			sys.stdout.write(self._alphabet[value[i]] if self._alphabet \
+				is not None else chr(value[i]))
 			if variable[1] == constants.ORIENT_HOR:
 				sys.stdout.write("\033[%dC"%(self._spacing*2+1))
 			else:
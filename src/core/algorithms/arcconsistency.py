@@ -0,0 +1,132 @@
+import numpy as np
+from collections import deque
+from ..data.wordindex import WordIndex, LETTERS_MAX
+
+"""
+Enforces arc consistency (AC-3) between the variables of a crossword before
+searching: a word stays in the domain of a variable only if, for each crossing,
+some word in the domain of the crossed variable has the same letter in the
+crossed cell. Words are removed until no domain changes, so the algorithms
+start searching with the words that can still be part of a solution
+
+Crossings are revised through the letters each variable can have in each
+position, so a crossing is only revised again when those letters change, and
+not each time a word is removed from the crossed variable
+"""
+class ArcConsistency(object):
+	"""
+	Class attributes:
+
+	@attr 	_domain       words of each length, as matrices
+	@attr 	_constraints  crossings of each variable
+	@attr 	_index        positional letter index of the domain
+	@attr 	_fixed        letters fixed in each variable
+	"""
+	__slots__ = ["_domain","_constraints","_index","_fixed"]
+
+	"""
+	Initializes the propagation with the given domain and constraints, the same
+	ones the algorithms are given
+
+	@param 	domain       domain of the variables
+	@param 	constraints  constraints to apply in the problem
+	@param 	index        positional letter index of the domain (built from
+	                     the domain if not given)
+	@param 	fixed        letters fixed in each variable before searching, as
+	                     lists of (position, letter) tuples (none if not
+	                     given)
+	"""
+	def __init__(self, domain, constraints, index=None, fixed=None):
+		self._domain = domain
+		self._constraints = constraints
+		self._index = index if index is not None else WordIndex(domain)
+		self._fixed = fixed
+
+	"""
+	Computes the arc consistent domains of the variables given
+
+	Variables with the same length and without fixed letters share their
+	domain until it changes, so the domains returned must not be modified in
+	place
+
+	@param 	variables 	variables of the crossword
+	@return list with a boolean array per variable telling which words of its
+			length are in its domain (empty arrays for lengths without words),
+			with an empty domain if the crossword has no solution
+	"""
+	def __call__(self, variables):
+		domains = []
+		# variables whose domain is the one shared by the variables of its
+		# length, so their letters can be shared too
+		shared = [True for _ in range(len(variables))]
+		initial = {}
+		for index, var in enumerate(variables):
+			if self._fixed is not None and self._fixed[index]:
+				shared[index] = False
+				domains.append(self._getDomain(index, var[0]))
+			else:
+				if var[0] not in initial:
+					initial[var[0]] = self._getDomain(index, var[0])
+				domains.append(initial[var[0]])
+		if not all(domain.any() for domain in domains):
+			return domains
+		# letters by (length, position) of the shared domains and by
+		# (variable, position) of the rest
+		lengthLetters, letters = {}, {}
+		def __letters(index, pos):
+			cache = lengthLetters if shared[index] else letters
+			key = (variables[index][0], pos) if shared[index] else (index, pos)
+			if key not in cache:
+				words = self._domain[variables[index][0]][domains[index],pos]
+				cache[key] = np.bincount(words, minlength=LETTERS_MAX) > 0
+			return cache[key]
+		# letters last propagated through each crossing
+		propagated = {}
+		queue = deque(range(len(variables)))
+		queued = [True for _ in range(len(variables))]
+		while queue:
+			index = queue.popleft()
+			queued[index] = False
+			for pos, other, other_pos in self._constraints[index]:
+				# variables crossing themselves are left to the algorithms
+				if other == index:
+					continue
+				supported = __letters(index, pos)
+				crossing = (index, pos, other, other_pos)
+				previous = propagated.get(crossing)
+				if previous is not None and np.array_equal(previous, supported):
+					continue
+				propagated[crossing] = supported
+				# nothing to remove if all the letters of the other variable
+				# are supported
+				if not (__letters(other, other_pos) & ~supported).any():
+					continue
+				length = variables[other][0]
+				domains[other] = domains[other] & \
+					supported[self._domain[length][:,other_pos]]
+				if not domains[other].any():
+					return domains
+				if shared[other]:
+					shared[other] = False
+				else:
+					for key in [(other, p) for p in range(length)]:
+						letters.pop(key, None)
+				if not queued[other]:
+					queue.append(other)
+					queued[other] = True
+		return domains
+
+	"""
+	Returns the domain of a variable: the words of its length not removed
+	that have the letters fixed in it
+
+	@param 	index 	index of the variable
+	@param 	length 	length of the variable
+	@return boolean array with an item per word of that length
+	"""
+	def _getDomain(self, index, length):
+		domain = self._index.getDomain(length)
+		if self._fixed is not None:
+			for pos, letter in self._fixed[index]:
+				domain &= self._index.getMask(length, pos, letter)
+		return domain
@@ -0,0 +1,239 @@
+import numpy as np
+from ..data.wordindex import WordIndex
+
+"""
+Propagates the letters each cell of a crossword can have: every cell keeps a
+bitmask with a bit per letter of the alphabet, the letters that the words left
+in the domains of all the variables over the cell have there. When the mask of
+a cell loses letters, the words with those letters in the cell are removed
+from the variables over it, which may take letters from other cells, until no
+mask changes
+
+Words are removed through the postings of the index, so only the words with
+the letters lost are visited, and the letters each variable has are counted
+per position and updated with the words removed, instead of scanning the
+whole domains again
+
+Cells are the groups of positions of the variables joined by the constraints,
+so a crossing is checked comparing two small integers instead of the letters
+of the whole domains. The backtracking maintaining arc consistency starts
+from these domains and masks, and keeps propagating the masks while searching
+"""
+class CellLetters(object):
+	"""
+	Class attributes:
+
+	@attr 	_domain       words of each length, as matrices
+	@attr 	_constraints  crossings of each variable
+	@attr 	_index        positional letter index of the domain
+	@attr 	_fixed        letters fixed in each variable
+	"""
+	__slots__ = ["_domain","_constraints","_index","_fixed"]
+
+	"""
+	Initializes the propagation with the given domain and constraints, the same
+	ones the algorithms are given
+
+	@param 	domain       domain of the variables
+	@param 	constraints  constraints to apply in the problem
+	@param 	index        positional letter index of the domain (built from
+	                     the domain if not given)
+	@param 	fixed        letters fixed in each variable before searching, as
+	                     lists of (position, letter) tuples (none if not
+	                     given)
+	"""
+	def __init__(self, domain, constraints, index=None, fixed=None):
+		self._domain = domain
+		self._constraints = constraints
+		self._index = index if index is not None else WordIndex(domain)
+		self._fixed = fixed
+
+	"""
+	Propagates the letters of the cells of the variables given
+
+	@param 	variables 	variables of the crossword
+	@param 	domains 	domain of each variable to start from (all the words
+						with the fixed letters if not given), not modified
+	@return tuple (domains, masks): list with the domain of each variable
+			after propagating, and list with the mask of the letters each
+			position of each variable can have (None if some variable is
+			left without words)
+	"""
+	def __call__(self, variables, domains=None):
+		lengths = np.array([var[0] for var in variables], dtype=np.int64)
+		if domains is None:
+			domains = [self._getDomain(index, length) for index, length in
+				enumerate(lengths.tolist())]
+		domains = list(domains)
+		if not all(domain.any() for domain in domains):
+			return domains, None
+		letters = 1 + max([int(self._domain[length].max()) for length in
+			set(lengths.tolist())] + [0])
+		dtype = self._getMaskType(letters)
+		starts = np.cumsum(lengths) - lengths
+		cells = self._getCells(lengths, starts)
+		owners = np.repeat(np.arange(len(variables)), lengths)
+		# variables over each cell, in compressed rows
+		order = np.argsort(cells, kind="stable")
+		offsets = np.searchsorted(cells[order], np.arange(cells.max()+2 if
+			len(cells) else 1))
+		weights = np.array([1 << letter for letter in range(letters)],
+			dtype=dtype)
+		counts = [self._getCounts(length, np.flatnonzero(domain), letters)
+			for length, domain in zip(lengths.tolist(), domains)]
+		bits = [self._getBits(count, weights) for count in counts]
+		masks = np.full(len(offsets)-1, (1 << letters) - 1, dtype=dtype)
+		if len(cells):
+			np.bitwise_and.at(masks, cells, np.concatenate(bits))
+		queue = list(range(len(variables)))
+		queued = np.ones(len(variables), dtype=bool)
+		while queue:
+			index = queue.pop()
+			queued[index] = False
+			length = lengths[index]
+			positions = cells[starts[index]:starts[index]+length]
+			current = masks[positions]
+			lost = bits[index] & ~current
+			narrowed = np.flatnonzero(lost)
+			if len(narrowed):
+				domain = domains[index].copy()
+				removed = [self._getWords(length, pos, lost[pos], domain)
+					for pos in narrowed.tolist()]
+				removed = np.unique(np.concatenate(removed))
+				domain[removed] = False
+				domains[index] = domain
+				if not domain.any():
+					return domains, None
+				counts[index] -= self._getCounts(length, removed, letters)
+				bits[index] = self._getBits(counts[index], weights)
+			changed = np.flatnonzero((current & bits[index]) != current)
+			if not len(changed):
+				continue
+			masks[positions[changed]] = current[changed] & \
+				bits[index][changed]
+			for cell in positions[changed].tolist():
+				for other in owners[order[offsets[cell]:offsets[cell+1]]]\
+					.tolist():
+					if other != index and not queued[other]:
+						queue.append(other)
+						queued[other] = True
+		return domains, [masks[cells[start:start+length]] for start, length
+			in zip(starts.tolist(), lengths.tolist())]
+
+	"""
+	Numbers the cells of the variables given, the positions of the variables
+	joined by the constraints
+
+	@param 	variables 	variables of the crossword
+	@return list with an array per variable with the cell of each position
+	"""
+	def getCells(self, variables):
+		lengths = np.array([var[0] for var in variables], dtype=np.int64)
+		starts = np.cumsum(lengths) - lengths
+		cells = self._getCells(lengths, starts)
+		return [cells[start:start+length] for start, length in
+			zip(starts.tolist(), lengths.tolist())]
+
+	"""
+	Returns the letter codes of a mask
+
+	@param 	mask 	mask of letters
+	@return list of letter codes, in increasing order
+	"""
+	@staticmethod
+	def getLetters(mask):
+		mask = int(mask)
+		return [letter for letter in range(mask.bit_length())
+			if mask >> letter & 1]
+
+	"""
+	Returns the unsigned integer type whose bits fit the letters, or Python
+	integers for alphabets bigger than any of them
+
+	@param 	letters 	number of letter codes
+	@return numpy type
+	"""
+	def _getMaskType(self, letters):
+		for dtype in (np.uint32, np.uint64):
+			if letters <= np.iinfo(dtype).bits:
+				return dtype
+		return object
+
+	"""
+	Numbers the cells of the variables: each position of a variable is a cell,
+	and the positions joined by a constraint are the same cell. Crossings of a
+	variable with itself are ignored, as the algorithms do
+
+	@param 	lengths 	length of each variable
+	@param 	starts 		index of the first position of each variable
+	@return array with the cell of each position of the variables, one after
+			the other
+	"""
+	def _getCells(self, lengths, starts):
+		crossings = np.array([(starts[index]+pos, starts[other]+other_pos)
+			for index, constraints in enumerate(self._constraints)
+			for pos, other, other_pos in constraints if other != index],
+			dtype=np.int64).reshape((-1,2))
+		labels = np.arange(int(lengths.sum()))
+		while True:
+			previous = labels
+			labels = labels.copy()
+			np.minimum.at(labels, crossings[:,0], labels[crossings[:,1]])
+			np.minimum.at(labels, crossings[:,1], labels[crossings[:,0]])
+			labels = labels[labels]
+			if np.array_equal(labels, previous):
+				break
+		return np.unique(labels, return_inverse=True)[1]
+
+	"""
+	Counts the words given with each letter in each position
+
+	@param 	length 	length of the words
+	@param 	words 	indexes of the words
+	@param 	letters number of letter codes
+	@return matrix of counts (positions, letters)
+	"""
+	def _getCounts(self, length, words, letters):
+		words = self._domain[length][words].astype(np.int64)
+		return np.bincount((words + np.arange(length)*letters).ravel(),
+			minlength=length*letters).reshape((length,letters))
+
+	"""
+	Returns the masks of the letters with some word in each position
+
+	@param 	counts 	matrix of counts (positions, letters)
+	@param 	weights bit of each letter, with the type of the masks
+	@return array with a mask per position
+	"""
+	def _getBits(self, counts, weights):
+		return ((counts > 0) * weights).sum(axis=1, dtype=weights.dtype)
+
+	"""
+	Returns the words of a domain with any of the letters of a mask in a
+	position, taken from the postings of the index
+
+	@param 	length 	length of the words
+	@param 	pos 	position of the letters
+	@param 	mask 	mask of the letters
+	@param 	domain 	boolean array of the words in the domain
+	@return array of word indexes
+	"""
+	def _getWords(self, length, pos, mask, domain):
+		words = np.concatenate([self._index.match(length, {pos: letter})
+			for letter in self.getLetters(mask)]).astype(np.intp)
+		return words[domain[words]]
+
+	"""
+	Returns the domain of a variable: the words of its length not removed
+	that have the letters fixed in it
+
+	@param 	index 	index of the variable
+	@param 	length 	length of the variable
+	@return boolean array with an item per word of that length
+	"""
+	def _getDomain(self, index, length):
+		domain = self._index.getDomain(length)
+		if self._fixed is not None:
+			for pos, letter in self._fixed[index]:
+				domain &= self._index.getMask(length, pos, letter)
+		return domain
@@ -0,0 +1,122 @@
+import numpy as np
+from ..data.wordindex import WordIndex, LETTERS_MAX
+
+# constants
+"""
+Kinds of problems found: a variable whose length has no words, a variable
+without words left in its domain (because of the letters fixed in it) and two
+variables that cross where no letter fits both of them
+"""
+PROBLEM_NO_WORDS = "no words"
+PROBLEM_EMPTY_DOMAIN = "empty domain"
+PROBLEM_NO_CROSSING_LETTER = "no crossing letter"
+
+"""
+Checks before searching if a crossword can have a solution with a wordlist,
+looking for problems that make any search fail: variables whose length has no
+words, variables whose domain is empty with the letters fixed in them and
+crossings where no letter fits the words of both variables. It only looks at
+each variable and crossing once, so passing the check doesn't mean the
+crossword has a solution, but failing it means it has none
+"""
+class FeasibilityChecker(object):
+	"""
+	Class attributes:
+
+	@attr 	_domain       words of each length, as matrices
+	@attr 	_constraints  crossings of each variable
+	@attr 	_index        positional letter index of the domain
+	@attr 	_fixed        letters fixed in each variable
+	"""
+	__slots__ = ["_domain","_constraints","_index","_fixed"]
+
+	"""
+	Initializes a new checker with the given domain and constraints, the same
+	ones the algorithms are given
+
+	@param 	domain       domain of the variables
+	@param 	constraints  constraints to apply in the problem
+	@param 	index        positional letter index of the domain (built from
+	                     the domain if not given)
+	@param 	fixed        letters fixed in each variable before searching, as
+	                     lists of (position, letter) tuples (none if not
+	                     given)
+	"""
+	def __init__(self, domain, constraints, index=None, fixed=None):
+		self._domain = domain
+		self._constraints = constraints
+		self._index = index if index is not None else WordIndex(domain)
+		self._fixed = fixed
+
+	"""
+	Checks the variables given, returning the problems found
+
+	@param 	variables 	variables of the crossword
+	@return list of problems found (empty if none), each one a tuple whose
+			first item is the kind of problem:
+				(PROBLEM_NO_WORDS, variable, length)
+				(PROBLEM_EMPTY_DOMAIN, variable, fixed letters)
+				(PROBLEM_NO_CROSSING_LETTER, variable, pos, other, other pos)
+	"""
+	def __call__(self, variables):
+		problems = []
+		domains = []
+		feasible = []
+		# domains of the variables without fixed letters, by length
+		shared = {}
+		for index, var in enumerate(variables):
+			if self._fixed is not None and self._fixed[index]:
+				domains.append(self._getDomain(index, var[0]))
+			else:
+				if var[0] not in shared:
+					shared[var[0]] = self._getDomain(index, var[0])
+				domains.append(shared[var[0]])
+			feasible.append(domains[index] is not None and
+				domains[index].any())
+			if domains[index] is None:
+				problems.append((PROBLEM_NO_WORDS, index, var[0]))
+			elif not feasible[index]:
+				problems.append((PROBLEM_EMPTY_DOMAIN, index,
+					self._fixed[index] if self._fixed is not None else []))
+		# letters each variable can have in each position, shared by the
+		# variables with the same length and without fixed letters
+		lengthLetters, letters = {}, {}
+		def __letters(index, pos):
+			length = variables[index][0]
+			if self._fixed is None or not self._fixed[index]:
+				cache, key = lengthLetters, (length, pos)
+			else:
+				cache, key = letters, (index, pos)
+			if key not in cache:
+				words = self._domain[length][domains[index],pos]
+				cache[key] = np.bincount(words, minlength=LETTERS_MAX) > 0
+			return cache[key]
+		for index, constraints in enumerate(self._constraints):
+			if not feasible[index]:
+				continue
+			for pos, other, other_pos in constraints:
+				if other <= index or not feasible[other]:
+					continue
+				if not (__letters(index, pos) & __letters(other, other_pos))\
+					.any():
+					problems.append((PROBLEM_NO_CROSSING_LETTER, index, pos,
+						other, other_pos))
+		return problems
+
+	"""
+	Returns the domain of a variable: the words of its length not removed
+	that have the letters fixed in it
+
+	@param 	index 	index of the variable
+	@param 	length 	length of the variable
+	@return boolean array with an item per word of that length, or None if
+			there are no words of that length
+	"""
+	def _getDomain(self, index, length):
+		if length >= len(self._domain) or not self._index.getCount(length):
+			return None
+		domain = self._index.getDomain(length)
+		if self._fixed is not None:
+			for pos, letter in self._fixed[index]:
+				domain &= self._index.getMask(length, pos, letter)
+		return domain
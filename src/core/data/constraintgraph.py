@@ -0,0 +1,238 @@
+import hashlib
+import numpy as np
+
+# constants
+"""
+Data type of the table of variables: for each variable, its length, its
+orientation, its number in the crossword and the cell (row, col) where it
+starts
+"""
+VARIABLE_DTYPE = np.dtype([("length",np.uint16),("orient",np.bool_),
+	("num",np.int32),("start",np.uint16,(2,))])
+
+"""
+Data type of the positions of the letters in the variables
+"""
+POSITION_DTYPE = np.uint16
+
+"""
+Array-backed version of the constraints of a crossword: the crossings of each
+variable are stored in compressed sparse rows (CSR), so the crossings of the
+variable v are the items offsets[v]..offsets[v+1]-1 of the arrays of
+neighbours and positions. This way all the crossings of a variable can be
+handled at once with array operations instead of iterating over tuples
+"""
+class ConstraintGraph(object):
+	"""
+	@attr 	_variables 			structured array of variables (VARIABLE_DTYPE)
+	@attr 	_offsets 			index of the first crossing of each variable,
+								plus the number of crossings at the end
+	@attr 	_neighbours 		variable crossed in each crossing
+	@attr 	_positions 			position of the letter crossed in the variable
+	@attr 	_neighbourPositions position of the letter crossed in the variable
+								crossed
+	"""
+	__slots__ = ["_variables","_offsets","_neighbours","_positions",
+	"_neighbourPositions"]
+
+	"""
+	Initializes the graph with the arrays given
+
+	@param 	variables 			structured array of variables
+	@param 	offsets 			index of the first crossing of each variable
+								(with an extra item with the number of
+								crossings)
+	@param 	neighbours 			variable crossed in each crossing
+	@param 	positions 			position of the letter crossed in the variable
+	@param 	neighbourPositions 	position of the letter crossed in the variable
+								crossed
+	"""
+	def __init__(self, variables, offsets, neighbours, positions,
+		neighbourPositions):
+		self._variables = np.asarray(variables, dtype=VARIABLE_DTYPE)
+		self._offsets = np.asarray(offsets, dtype=np.int64)
+		self._neighbours = np.asarray(neighbours, dtype=np.int32)
+		self._positions = np.asarray(positions, dtype=POSITION_DTYPE)
+		self._neighbourPositions = np.asarray(neighbourPositions,
+			dtype=POSITION_DTYPE)
+
+	"""
+	Creates the graph from the variables and constraints as lists of tuples,
+	as the crossword returns them
+
+	@param 	variables 	list of (length, orient, num, (row, col)) tuples
+	@param 	constraints list with a list of (pos, other variable, other pos)
+						tuples per variable
+	@return constraint graph
+	"""
+	@staticmethod
+	def fromLists(variables, constraints):
+		crossings = np.array([constraint for constraints in constraints
+			for constraint in constraints], dtype=np.int64).reshape((-1,3))
+		offsets = np.zeros(len(constraints)+1, dtype=np.int64)
+		offsets[1:] = np.cumsum([len(constraints) for constraints in
+			constraints])
+		return ConstraintGraph(np.array(variables, dtype=VARIABLE_DTYPE),
+			offsets, crossings[:,1], crossings[:,0], crossings[:,2])
+
+	"""
+	Returns the variables and constraints of the graph as lists of tuples, as
+	the crossword returns them
+
+	@return tuple (list of variables, tuple of lists of constraints)
+	"""
+	def toLists(self):
+		variables = list(zip(self._variables["length"].tolist(),
+			self._variables["orient"].tolist(),
+			self._variables["num"].tolist(),
+			map(tuple, self._variables["start"].tolist())))
+		crossings = list(zip(self._positions.tolist(),
+			self._neighbours.tolist(), self._neighbourPositions.tolist()))
+		offsets = self._offsets.tolist()
+		constraints = tuple([crossings[offsets[i]:offsets[i+1]]
+			for i in range(len(self._variables))])
+		return variables, constraints
+
+	"""
+	Returns the number of variables of the graph
+
+	@return 	number of variables
+	"""
+	def __len__(self):
+		return len(self._variables)
+
+	"""
+	Returns the table of variables
+
+	@return 	structured array of variables (VARIABLE_DTYPE)
+	"""
+	def getVariables(self):
+		return self._variables
+
+	"""
+	Returns the offsets of the crossings of each variable
+
+	@return 	array with the index of the first crossing of each variable
+				and the number of crossings at the end
+	"""
+	def getOffsets(self):
+		return self._offsets
+
+	"""
+	Returns the variable crossed in each crossing
+
+	@return 	array of variable indexes
+	"""
+	def getNeighbours(self):
+		return self._neighbours
+
+	"""
+	Returns the position of the letter crossed in each crossing, in the
+	variable that has the crossing
+
+	@return 	array of positions
+	"""
+	def getPositions(self):
+		return self._positions
+
+	"""
+	Returns the position of the letter crossed in each crossing, in the
+	variable crossed
+
+	@return 	array of positions
+	"""
+	def getNeighbourPositions(self):
+		return self._neighbourPositions
+
+	"""
+	Returns the number of crossings of each variable
+
+	@return 	array with the number of crossings of each variable
+	"""
+	def getDegrees(self):
+		return np.diff(self._offsets)
+
+	"""
+	Returns the crossings of a variable
+
+	@param 	variable 	index of the variable
+	@return tuple of arrays (positions, neighbours, neighbour positions)
+	"""
+	def getCrossings(self, variable):
+		first, last = self._offsets[variable], self._offsets[variable+1]
+		return self._positions[first:last], self._neighbours[first:last], \
+			self._neighbourPositions[first:last]
+
+	"""
+	Returns the variable that has each crossing
+
+	@return 	array of variable indexes, one per crossing
+	"""
+	def getOwners(self):
+		return np.repeat(np.arange(len(self._variables)), self.getDegrees())
+
+	"""
+	Finds the connected components of the graph, this means, the groups of
+	variables that share no cells with the variables of other groups, so each
+	group can be solved independently
+
+	Labels are propagated through the crossings as the minimum variable index
+	reached, shortcutting them to the label of their label each round
+
+	@return 	array with the component of each variable, numbered in the order
+				of their first variable
+	"""
+	def getComponents(self):
+		owners = self.getOwners()
+		neighbours = self._neighbours.astype(np.int64)
+		labels = np.arange(len(self._variables))
+		while True:
+			previous = labels
+			labels = labels.copy()
+			np.minimum.at(labels, owners, labels[neighbours])
+			np.minimum.at(labels, neighbours, labels[owners])
+			labels = labels[labels]
+			if np.array_equal(labels, previous):
+				break
+		return np.unique(labels, return_inverse=True)[1]
+
+	"""
+	Returns the graph restricted to the variables given, renumbered in the
+	order given. Crossings with variables not given are dropped
+
+	@param 	variables 	indexes of the variables to keep
+	@return constraint graph of the variables
+	"""
+	def getSubgraph(self, variables):
+		variables = np.asarray(variables, dtype=np.int64)
+		mapping = np.full(len(self._variables), -1, dtype=np.int64)
+		mapping[variables] = np.arange(len(variables))
+		owners = mapping[self.getOwners()]
+		neighbours = mapping[self._neighbours]
+		keep = np.flatnonzero((owners >= 0) & (neighbours >= 0))
+		keep = keep[np.argsort(owners[keep], kind="stable")]
+		offsets = np.zeros(len(variables)+1, dtype=np.int64)
+		offsets[1:] = np.cumsum(np.bincount(owners[keep],
+			minlength=len(variables)))
+		return ConstraintGraph(self._variables[variables], offsets,
+			neighbours[keep], self._positions[keep],
+			self._neighbourPositions[keep])
+
+	"""
+	Computes a hash of the structure of the graph: the length and orientation
+	of each variable and the crossings between them. Numbers and cells of the
+	variables are left out, so renumbered or moved grids with the same words
+	and crossings have the same hash
+
+	@return 	hexadecimal digest string
+	"""
+	def getHash(self):
+		digest = hashlib.sha1()
+		for array in (self._variables["length"].astype("<u2"),
+			self._variables["orient"].astype(np.uint8),
+			self._offsets.astype("<i8"), self._neighbours.astype("<i4"),
+			self._positions.astype("<u2"),
+			self._neighbourPositions.astype("<u2")):
+			digest.update(np.int64(len(array)).astype("<i8").tobytes())
+			digest.update(np.ascontiguousarray(array).tobytes())
+		return digest.hexdigest()
@@ -1,6 +1,11 @@
 # libraries
+import itertools
+import hashlib
+import numpy as np
 from .constants import *
 from ..helpers.parse import *
+from ..helpers import binfile
+from .constraintgraph import ConstraintGraph, VARIABLE_DTYPE
 
 #constants
 """
@@ -14,6 +19,40 @@ variables because no variable exists / variable has no length enough
 """
 VARIABLE_REAL_UNKOWN = None
 
+"""
+Kinds of cells in the matrix of cells of the crossword: empty cells, cells of
+a word, numbered cells where words start, cells with unknown values and cells
+missing in rows shorter than the first one
+"""
+CELL_EMPTY = 0
+CELL_WORD = 1
+CELL_NUMBER = 2
+CELL_UNKNOWN = 3
+CELL_MISSING = 4
+
+"""
+Extension added to the crossword filename to store its compiled version
+"""
+COMPILED_EXT = ".compiled"
+
+"""
+Version of the compiled crossword format, files with other versions are not
+loaded
+"""
+COMPILED_VERSION = 3
+
+"""
+Start of the lines that separate the crosswords in a file with many
+crosswords, the rest of the line is the name of the crossword that follows
+"""
+CONTAINER_SEPARATOR = "%"
+
+"""
+Code given to the cells that are not part of any variable when rendering
+solutions as arrays of letter codes
+"""
+RENDER_EMPTY = 255
+
 
 """
 Loads, reads and manipulates crossword puzzles in order
@@ -45,10 +84,31 @@ class Crossword(object):
 							returns a tuple indicating the orientation
 							and the number of the real var:
 								(orient,real_var_number)
+	@attr 	_cells 			matrix with the kind of each cell (CELL_*)
+	@attr 	_numbers 		matrix with the number of each numbered cell
+	@attr 	_letters 		matrix with the letter pre-filled in each cell,
+							or an empty string if none
+	@attr 	_seeds 			list of (orient, num, word) with the words
+							pre-filled in variables
+	@attr 	_fixed 			for each variable, dictionary of position ->
+							letter with the letters fixed in it by the
+							pre-filled cells and seed words
+	@attr 	_compiled 		tuple (values, grid) with the different values of
+							the cells and the index of the value of each cell
+							when loaded from a compiled file, till the
+							crossword as lists is needed
+	@attr 	_graph 			constraints as a constraint graph, built the first
+							time it's needed
+	@attr 	_cellMap 		tuple (cells, variables, offsets, sizes) with the
+							cells filled by the variables, the variable and
+							the letter that fills each one and the letters
+							each variable needs, built the first time it's
+							needed
 	"""
 	__slots__ = ["_crossword","_filename","_hasRead",
 	"_rows","_cols","_last_word","_hasParsed","_variables","_vars_limit",
-	"_constraints","_from2DVars","_from1DVars"]
+	"_constraints","_from2DVars","_from1DVars","_cells","_numbers","_compiled",
+	"_graph","_cellMap","_letters","_seeds","_fixed"]
 
 	"""
 	Initializes a new crossword with empty values
@@ -67,6 +127,14 @@ class Crossword(object):
 		self._constraints = None
 		self._from2DVars = (None,None)
 		self._from1DVars = []
+		self._cells = None
+		self._numbers = None
+		self._compiled = None
+		self._graph = None
+		self._cellMap = None
+		self._letters = None
+		self._seeds = []
+		self._fixed = []
 
 	"""
 	Reads the crossword from the file and transforms it into a list of lists
@@ -86,24 +154,160 @@ class Crossword(object):
 	crossword
 	"""
 	def _readFile(self):
-		crossword = [line.rstrip('\n') for line in open(self._filename, 'r')]
+		with open(self._filename, 'r') as f:
+			self._readLines(f)
+
+	"""
+	Reads the crossword from lines already loaded instead of from the file,
+	the same way read() does
+
+	@param 	lines 	iterable of lines of the crossword
+	@return self, the same instance
+	"""
+	def readLines(self, lines):
+		self._readLines(lines)
+		self._readFeatures()
+		self._hasRead = True
+		return self
+
+	"""
+	Loads the given lines into a list of lists with each item being a line of
+	the crossword
+
+	@param 	lines 	iterable of lines of the crossword
+	"""
+	def _readLines(self, lines):
+		crossword = [line.rstrip('\n') for line in lines]
 		crossword = list(map(lambda x: x.split("\t"),crossword))
 		self._crossword = crossword
 
 	"""
-	Finds in the crossword the number of rows and cols and number of variables
+	Reads a file with many crosswords, yielding them one by one while the file
+	is read, so files with lots of crosswords are read with constant memory.
+	Crosswords are separated by lines starting with CONTAINER_SEPARATOR,
+	followed by their name, and empty lines between them are skipped. Each
+	crossword gets as origin the filename followed by its name (or its
+	position in the file if it has no name)
+
+	If crosswords are not parsed, errors parsing one of them can be handled
+	without stopping reading the others
+
+	@param 	filename 	file with the crosswords
+	@param 	parse 		if True, crosswords are parsed, else they are read
+	@throws IOError 	if error opening file
+	@throws ValueError 	if parsing and some crossword is not valid
+	@return generator of crosswords
+	"""
+	@staticmethod
+	def iterFile(filename, parse=True):
+		def __crossword(name, lines):
+			crossword = Crossword("%s:%s"%(filename,name)).readLines(lines)
+			return crossword.parse() if parse else crossword
+		with open(filename, 'r') as f:
+			count, name, lines = 0, None, []
+			for line in f:
+				if line.startswith(CONTAINER_SEPARATOR):
+					if lines:
+						count += 1
+						yield __crossword(name or count, lines)
+					name = line[len(CONTAINER_SEPARATOR):].strip()
+					lines = []
+				elif line.strip():
+					lines.append(line)
+			if lines:
+				yield __crossword(name or count+1, lines)
+
+	"""
+	Writes many crosswords into a file, separated by lines with their names,
+	so they can be read back with iterFile
+
+	@param 	filename 	file to write
+	@param 	crosswords 	iterable of read crosswords
+	@param 	names 		iterable with the name of each crossword (their
+						positions in the file by default)
+	@throws IOError 	if unable to write the file
+	"""
+	@staticmethod
+	def writeFile(filename, crosswords, names=None):
+		if names is None:
+			names = itertools.count(1)
+		with open(filename, 'w') as f:
+			for crossword, name in zip(crosswords, names):
+				f.write("%s %s\n"%(CONTAINER_SEPARATOR,name))
+				for row in crossword.getLists():
+					f.write("\t".join(row)+"\n")
+
+	"""
+	Finds in the crossword the number of rows and cols and number of variables,
+	and classifies its cells into a matrix of kinds of cell
+
+	Each different value is classified once, so the cost doesn't depend on
+	checking every cell
 	"""
 	def _readFeatures(self):
 		assert self._crossword != None
 		self._rows = len(self._crossword)
 		self._cols = len(self._crossword[0])
-		self._last_word = max(max(map(
-			lambda x: int(x) if isInteger(x) and int(x) > 0 else 0,sl))
-			for sl in self._crossword)
+		lengths = np.array([len(row) for row in self._crossword])
+		values, cells = np.unique([cell for row in self._crossword
+			for cell in row], return_inverse=True)
+		kinds, numbers, letters = self._classifyCells(values)
+		self._last_word = max(0, int(numbers.max(initial=0)))
+		# place the cells into matrices
+		rows = np.repeat(np.arange(self._rows), lengths)
+		cols = np.arange(len(cells)) - np.repeat(np.cumsum(lengths)-lengths,
+			lengths)
+		inside = cols < self._cols
+		self._cells = np.full((self._rows,self._cols), CELL_MISSING,
+			dtype=np.uint8)
+		self._cells[rows[inside],cols[inside]] = kinds[cells[inside]]
+		self._numbers = np.zeros((self._rows,self._cols), dtype=np.int64)
+		self._numbers[rows[inside],cols[inside]] = numbers[cells[inside]]
+		self._letters = np.full((self._rows,self._cols), "",
+			dtype=letters.dtype)
+		self._letters[rows[inside],cols[inside]] = letters[cells[inside]]
 		self._from2DVars = (
 		[None for _ in range(self._last_word)],
 		[None for _ in range(self._last_word)])
 
+	"""
+	Classifies each of the different values of the cells
+
+	@param 	values 	array of values of cells
+	@return tuple of arrays (kinds of cell, numbers of the cells or 0 if not
+			numbered, letters of the cells or empty strings if not
+			pre-filled)
+	"""
+	def _classifyCells(self, values):
+		kinds = np.empty(len(values), dtype=np.uint8)
+		numbers = np.zeros(len(values), dtype=np.int64)
+		letters = []
+		for i, value in enumerate(values.tolist()):
+			kinds[i], numbers[i], letter = self._classifyCell(value)
+			letters.append(letter)
+		return kinds, numbers, np.array(letters + [""])[:len(values)]
+
+	"""
+	Classifies the value of a cell. Cells of words can be pre-filled with a
+	letter, alone or after the number in numbered cells (as in 12A)
+
+	@param 	value 	value of the cell as read
+	@return tuple (kind of cell, number of the cell or 0 if not numbered,
+			letter of the cell or empty string if not pre-filled)
+	"""
+	def _classifyCell(self, value):
+		if value == CROSSWORD_CELL_EMPTY:
+			return CELL_EMPTY, 0, ""
+		elif value == CROSSWORD_CELL_WORD:
+			return CELL_WORD, 0, ""
+		elif isInteger(value):
+			return CELL_NUMBER, int(value), ""
+		elif len(value) == 1 and value.isalpha():
+			return CELL_WORD, 0, value
+		elif len(value) > 1 and value[-1].isalpha() and isInteger(value[:-1]):
+			return CELL_NUMBER, int(value[:-1]), value[-1]
+		return CELL_UNKNOWN, 0, ""
+
 	"""
 	Parses the values of the crossword to find the variables that have to be
 	assigned and the constraints that apply
@@ -132,107 +336,321 @@ class Crossword(object):
 
 	Won't add variable whose size is < constants.WORDS_LEN_MIN
 
+	Runs of cells are found on the whole matrix of cells at once, first by rows
+	(horizontal variables) and then by columns (vertical variables), and the
+	cells where a horizontal and a vertical run cross give the constraints
+
 	@throws 	ValueError 	if some character not allowed is found
 	"""
 	def _parse(self):
 		assert self._hasRead
-		# init variables
+		self._graph = None
+		self._cellMap = None
+		missing = np.argwhere(self._cells == CELL_MISSING)
+		if len(missing):
+			raise ValueError("crossword row %d has less than %d cells"%(
+				missing[0][0]+1,self._cols))
+		unknown = np.argwhere(self._cells == CELL_UNKNOWN)
+		if len(unknown):
+			i, j = unknown[0].tolist()
+			raise ValueError("unknown cell value %s "%(self._crossword[i][j])
+			+"while parsing crossword cell [%d][%d]"%(i+1,j+1))
+		# find variables
 		self._variables = []
-		variable_start = (0,0)
-		variable_len = 0
-		variable_n = 0
-		orient = None
-		constraints_table = tuple([
-			tuple([[] for __ in range(self._cols)])
-				for _ in range(self._rows)])
-
-		# parses the current cell to add constraint / variable
-		"""
-		Given the i,j coordinates of the crossword of the cell, parses the
-		content of the cell and modifies the function current variable read,
-		and variable number in order to add variables and constraints
-
-		@param 	i 	crossword row index (0-based)
-		@param 	j 	crossword col index (0-based)
-		"""
-		def __parseCell(i,j):
-			nonlocal orient
-			nonlocal variable_len
-			nonlocal variable_n
-			nonlocal variable_start
-			nonlocal constraints_table
-			cell = self._crossword[i][j]
-			if variable_len:
-				# reading a variable
-				if cell == CROSSWORD_CELL_WORD or isInteger(cell):
-					constraints_table[i][j].append(
-						(len(self._variables),variable_len))
-					variable_len += 1
-				elif cell == CROSSWORD_CELL_EMPTY:
-					self._addVariable(orient,variable_n,variable_len,
-					variable_start)
-					variable_len = 0
-			else:
-				# not reading variable
-				# empty field / other orientation word
-				if cell == CROSSWORD_CELL_EMPTY or \
-					cell == CROSSWORD_CELL_WORD:
-					return
-				# numeric field
-				elif isInteger(cell):
-					variable_n = int(cell)
-					variable_start = (i,j)
-					constraints_table[i][j].append(
-						(len(self._variables),variable_len))
-					variable_len += 1
-				# field unknown
-				else:
-					raise ValueError("unknown cell value %s "%(cell)
-					+"while parsing crossword cell [%d][%d]"%(i+1,j+1))
-
-		# read horizontal
-		orient = ORIENT_HOR
-		for i in range(self._rows):
-			for j in range(self._cols):
-				__parseCell(i,j)
-			# end of row
-			variables_now = len(self._variables)
-			self._addVariable(orient,variable_n,variable_len,variable_start)
-			variables_later = len(self._variables)
-			if variables_later - variables_now == 0 and variable_len:
-				constraints_table[i][j].pop()
-			variable_len = 0
-
-		# set horizontal limit
-		self._vars_limit = len(self._variables)
-		variable_len = 0
-
-		# read vertical
-		orient = ORIENT_VER
-		for j in range(self._cols):
-			for i in range(self._rows):
-				__parseCell(i,j)
-			# end of col
-			self._addVariable(orient,variable_n,variable_len,variable_start)
-			variable_len = 0
-
+		runs = (self._findRuns(self._cells), self._findRuns(self._cells.T))
+		for orient, (lines, firsts, lengths) in zip((ORIENT_HOR,ORIENT_VER),
+			runs):
+			rows, cols = (lines, firsts) if orient == ORIENT_HOR else \
+				(firsts, lines)
+			for num, length, start in zip(self._numbers[rows,cols].tolist(),
+				lengths.tolist(), zip(rows.tolist(), cols.tolist())):
+				self._addVariable(orient,num,length,start)
+			if orient == ORIENT_HOR:
+				# set horizontal limit
+				self._vars_limit = len(self._variables)
+		# find the variable and position of each cell in each orientation
+		cells = []
+		variables = 0
+		for orient, (lines, firsts, lengths) in zip((ORIENT_HOR,ORIENT_VER),
+			runs):
+			# runs too short point to the next variable added
+			valid = lengths >= WORDS_LEN_MIN
+			indexes = variables + np.cumsum(valid) - valid
+			variables += np.count_nonzero(valid)
+			if orient == ORIENT_HOR:
+				# short runs ending a row don't keep their last cell
+				lengths = lengths - (~valid & (firsts+lengths == self._cols))
+			owners = np.repeat(np.arange(len(lengths)), lengths)
+			positions = np.arange(len(owners)) - \
+				np.repeat(np.cumsum(lengths)-lengths, lengths)
+			table = np.full(self._cells.shape if orient == ORIENT_HOR else
+				self._cells.T.shape, -1, dtype=np.int64)
+			table[lines[owners],firsts[owners]+positions] = indexes[owners]
+			offsets = np.zeros_like(table)
+			offsets[lines[owners],firsts[owners]+positions] = positions
+			if orient == ORIENT_VER:
+				table, offsets = table.T, offsets.T
+			cells.append((table, offsets))
 		# set constraints to list
 		self._constraints = tuple([[] for _ in range(len(self._variables))])
-		for i in range(self._rows):
-			for j in range(self._cols):
-				constraints = constraints_table[i][j]
-				if len(constraints) == 2:
-					self._constraints[constraints[0][0]].append(
-						(constraints[0][1],constraints[1][0],
-						constraints[1][1]))
-					self._constraints[constraints[1][0]].append(
-						(constraints[1][1],constraints[0][0],
-						constraints[0][1]))
-				elif len(constraints) > 2:
-					raise ValueError("More than 2 constraints on a 2D world, "
-					+"I think you're wrong ;) (or maybe I'm)")
+		(hor, hor_pos), (ver, ver_pos) = cells
+		crossings = (hor >= 0) & (ver >= 0)
+		hor, hor_pos = hor[crossings], hor_pos[crossings]
+		ver, ver_pos = ver[crossings], ver_pos[crossings]
+		owners = np.stack((hor, ver), axis=1).ravel()
+		constraints = np.stack((
+			np.stack((hor_pos, ver, ver_pos), axis=1),
+			np.stack((ver_pos, hor, hor_pos), axis=1)), axis=1).reshape(-1,3)
+		order = np.argsort(owners, kind="stable")
+		owners = owners[order]
+		constraints = list(map(tuple, constraints[order].tolist()))
+		bounds = np.flatnonzero(np.diff(owners)) + 1
+		for owner, first, last in zip(
+			owners[np.concatenate(([0], bounds)).astype(np.intp)].tolist()
+			if len(owners) else [], [0] + bounds.tolist(),
+			bounds.tolist() + [len(owners)]):
+			self._constraints[owner].extend(constraints[first:last])
+		self._fixLetters()
 		self._hasParsed = True
 
+	"""
+	Finds the runs of cells that form variables in each row of a matrix of
+	cells. A run starts in the first numbered cell of a sequence of non-empty
+	cells and lasts till the end of that sequence
+
+	@param 	cells 	matrix of kinds of cell
+	@param 	numbered 	matrix telling the cells where runs can start (the
+						numbered cells by default)
+	@return tuple of arrays (row, first column, length) of each run, sorted
+			by row and column
+	"""
+	def _findRuns(self, cells, numbered=None):
+		cols = cells.shape[1] + 1
+		if numbered is None:
+			numbered = cells == CELL_NUMBER
+		# an empty column at the end splits the rows
+		cells = np.concatenate((cells, np.full((cells.shape[0],1), CELL_EMPTY,
+			dtype=cells.dtype)), axis=1).ravel()
+		numbered = np.flatnonzero(np.concatenate((numbered,
+			np.zeros((numbered.shape[0],1), dtype=bool)), axis=1))
+		filled = cells != CELL_EMPTY
+		starts = filled.copy()
+		starts[1:] &= ~filled[:-1]
+		ends = np.flatnonzero(filled[:-1] & ~filled[1:])
+		sequences = np.cumsum(starts) - 1
+		sequence, first = np.unique(sequences[numbered], return_index=True)
+		firsts = numbered[first]
+		lengths = ends[sequence] - firsts + 1
+		return firsts // cols, firsts % cols, lengths
+
+	"""
+	Fixes the letters of the variables given by the pre-filled cells and the
+	seed words, filling the _fixed attribute. Each letter fixed is also fixed
+	in the variables crossing it there
+
+	A successful call to _readFeatures() must be done and the variables and
+	constraints must be set before calling this method
+
+	@throws 	ValueError 	if a seed word doesn't fit its variable or some
+						letters fixed in the same cell are different
+	"""
+	def _fixLetters(self):
+		self._fixed = [{} for _ in range(len(self._variables))]
+		if (self._letters != "").any():
+			variables = 0
+			for cells, letters in ((self._cells, self._letters),
+				(self._cells.T, self._letters.T)):
+				lines, firsts, lengths = self._findRuns(cells)
+				valid = lengths >= WORDS_LEN_MIN
+				lines, firsts, lengths = lines[valid], firsts[valid], \
+					lengths[valid]
+				owners = np.repeat(np.arange(len(lengths)), lengths)
+				positions = np.arange(len(owners)) - \
+					np.repeat(np.cumsum(lengths)-lengths, lengths)
+				found = letters[lines[owners],firsts[owners]+positions]
+				filled = found != ""
+				for owner, pos, letter in zip(owners[filled].tolist(),
+					positions[filled].tolist(), found[filled].tolist()):
+					self._fixLetter(variables+owner, pos, letter)
+				variables += len(lengths)
+		for orient, num, word in self._seeds:
+			self._fixSeed(orient, num, word)
+
+	"""
+	Fixes the letters of a seed word in its variable
+
+	@param 	orient 	orientation of the variable
+	@param 	num 	number of the variable
+	@param 	word 	word to fix in the variable
+	@throws ValueError 	if the variable doesn't exist, the word doesn't fit
+						it or some of its letters are already fixed to others
+	"""
+	def _fixSeed(self, orient, num, word):
+		index = self._from2DVars[orient][num-1] if 0 < num <= \
+			self._last_word else VARIABLE_REAL_UNKOWN
+		name = ("H%02d" if orient == ORIENT_HOR else "V%02d")%num
+		if index == VARIABLE_REAL_UNKOWN:
+			raise ValueError("seed word %s for variable %s, "%(word,name)
+			+"which doesn't exist")
+		if len(word) != self._variables[index][0]:
+			raise ValueError("seed word %s doesn't fit variable %s "%(word,name)
+			+"of %d letters"%self._variables[index][0])
+		for pos, letter in enumerate(word):
+			self._fixLetter(index, pos, letter)
+
+	"""
+	Fixes a letter of a variable, and the letter of the variables crossing it
+	in that position
+
+	@param 	index 	index of the variable
+	@param 	pos 	position of the letter in the variable
+	@param 	letter 	letter to fix
+	@throws ValueError 	if the letter is already fixed to another one
+	"""
+	def _fixLetter(self, index, pos, letter):
+		fixed = self._fixed[index].get(pos)
+		if fixed == letter:
+			return
+		elif fixed is not None:
+			raise ValueError("letter %s of variable %s "%(letter,
+				self.getVariableString(index))
+			+"in position %d is already fixed to %s"%(pos+1,fixed))
+		self._fixed[index][pos] = letter
+		for constraint in self._constraints[index]:
+			if constraint[0] == pos:
+				self._fixLetter(constraint[1], constraint[2], letter)
+
+	"""
+	Adds a seed word, a word pre-filled in a variable, so the letters of the
+	variable are fixed when parsing the crossword (or at once if it's already
+	parsed). If the seed can't be fixed, no letter of it is fixed
+
+	@param 	orient 	orientation of the variable
+	@param 	num 	number of the variable
+	@param 	word 	word to fix in the variable
+	@throws ValueError 	if already parsed and the variable doesn't exist, the
+						word doesn't fit it or the letters are fixed to others
+	@return self
+	"""
+	def addSeed(self, orient, num, word):
+		if self._hasParsed:
+			fixed = self._fixed
+			self._fixed = [dict(letters) for letters in fixed]
+			try:
+				self._fixSeed(orient, num, word)
+			except ValueError:
+				self._fixed = fixed
+				raise
+		self._seeds.append((orient, num, word))
+		return self
+
+	"""
+	Returns the letters fixed in each variable by the pre-filled cells and the
+	seed words, in the same format as the letters the solvers assign to the
+	variables while searching
+
+	Previously a successful call to parse() must be done
+
+	@return 	list with a list of (position, letter) tuples per variable
+	"""
+	def getFixedLetters(self):
+		assert self._hasParsed
+		return [sorted(fixed.items()) for fixed in self._fixed]
+
+	"""
+	Returns the filename of the compiled version of the crossword
+
+	@return 	compiled crossword filename
+	"""
+	def getCompiledFilename(self):
+		return self._filename + COMPILED_EXT
+
+	"""
+	Saves the crossword already parsed into a compiled binary file: the grid
+	(as an index into its different values), the table of variables and the
+	constraints of each variable as arrays, along with the signature of the
+	crossword file to check later if it's still fresh
+
+	@param 	filename 	file to save to (the compiled filename by default)
+	@throws IOError 	if unable to write the file
+	@return self
+	"""
+	def saveCompiled(self, filename=None):
+		assert self._hasParsed
+		values, grid = np.unique(np.array([row[:self._cols]
+			for row in self.getLists()]), return_inverse=True)
+		graph = self.getConstraintGraph()
+		header = {
+			"version":COMPILED_VERSION,
+			"source":binfile.fileSignature(self._filename),
+			"rows":self._rows,
+			"cols":self._cols,
+			"last_word":self._last_word,
+			"vars_limit":self._vars_limit,
+			"values":values.tolist()}
+		arrays = {
+			"grid":grid.reshape((self._rows,self._cols)).astype(np.uint32),
+			"cells":self._cells,
+			"numbers":self._numbers,
+			"letters":self._letters,
+			"var_len":graph.getVariables()["length"],
+			"var_orient":graph.getVariables()["orient"],
+			"var_num":graph.getVariables()["num"],
+			"var_start":graph.getVariables()["start"],
+			"offsets":graph.getOffsets(),
+			"neighbours":graph.getNeighbours(),
+			"positions":graph.getPositions(),
+			"neighbour_positions":graph.getNeighbourPositions()}
+		binfile.write(filename or self.getCompiledFilename(), header, arrays)
+		return self
+
+	"""
+	Loads the crossword from a compiled binary file saved with saveCompiled,
+	leaving it read and parsed without reading or parsing the crossword file.
+	The compiled file is only loaded if the crossword file has not changed
+	since it was saved (checked by its size, modification time and hash)
+
+	@param 	filename 	file to load from (the compiled filename by default)
+	@return True if loaded, False if the file is missing, invalid or stale
+	"""
+	def loadCompiled(self, filename=None):
+		try:
+			header, arrays = binfile.read(filename or
+				self.getCompiledFilename())
+		except (OSError, ValueError):
+			return False
+		if header.get("version") != COMPILED_VERSION or \
+			not binfile.matchesSignature(self._filename, header["source"]):
+			return False
+		self._crossword = None
+		self._compiled = (header["values"], arrays["grid"])
+		self._cells = arrays["cells"]
+		self._numbers = arrays["numbers"]
+		self._letters = arrays["letters"]
+		self._rows = header["rows"]
+		self._cols = header["cols"]
+		self._last_word = header["last_word"]
+		self._vars_limit = header["vars_limit"]
+		self._from2DVars = (
+		[None for _ in range(self._last_word)],
+		[None for _ in range(self._last_word)])
+		self._from1DVars = []
+		variables = np.empty(len(arrays["var_len"]), dtype=VARIABLE_DTYPE)
+		for field, name in (("length","var_len"),("orient","var_orient"),
+			("num","var_num"),("start","var_start")):
+			variables[field] = arrays[name]
+		self._cellMap = None
+		self._graph = ConstraintGraph(variables, arrays["offsets"],
+			arrays["neighbours"], arrays["positions"],
+			arrays["neighbour_positions"])
+		self._variables, self._constraints = self._graph.toLists()
+		for index, var in enumerate(self._variables):
+			self._setVariableRelation(var[1],var[2],index)
+		self._fixLetters()
+		self._hasRead = True
+		self._hasParsed = True
+		return True
+
 	"""
 	Sets the plain 1D variable index equivalent of the given combination of
 	orientation, variable number that represent a 2D variable
@@ -307,6 +725,10 @@ class Crossword(object):
 	"""
 	def getLists(self):
 		assert self._hasRead
+		if self._crossword is None:
+			values, grid = self._compiled
+			self._crossword = np.array(values)[grid].tolist()
+			self._compiled = None
 		return self._crossword
 
 	"""
@@ -355,6 +777,70 @@ class Crossword(object):
 		assert self._hasParsed
 		return self._constraints
 
+	"""
+	Returns the constraints as a constraint graph, backed by arrays instead of
+	lists of tuples: the crossings of each variable in compressed sparse rows
+	and the variables as a structured array
+
+	Previously a successful call to parse() must be done
+
+	@return 	constraint graph
+	"""
+	def getConstraintGraph(self):
+		assert self._hasParsed
+		if self._graph is None:
+			self._graph = ConstraintGraph.fromLists(self._variables,
+				self._constraints)
+		return self._graph
+
+	"""
+	Returns a hash of the structure of the crossword: the lengths of its
+	variables and how they cross, leaving out the numbering, so the same grid
+	renumbered has the same hash (see ConstraintGraph.getHash). The letters
+	fixed by pre-filled cells and seed words are part of the structure
+
+	Previously a successful call to parse() must be done
+
+	@return 	hexadecimal digest string
+	"""
+	def getStructureHash(self):
+		structure = self.getConstraintGraph().getHash()
+		fixed = [(index, pos, letter) for index, letters in
+			enumerate(self.getFixedLetters()) for pos, letter in letters]
+		if not fixed:
+			return structure
+		return hashlib.sha1((structure+repr(fixed)).encode("utf-8"))\
+			.hexdigest()
+
+	"""
+	Returns the connected components of the crossword, this means, the groups
+	of variables that share no cells with the variables of other groups
+
+	Previously a successful call to parse() must be done
+
+	@return 	list with the sorted list of variable indexes of each component
+	"""
+	def getComponents(self):
+		labels = self.getConstraintGraph().getComponents()
+		if not len(labels):
+			return []
+		order = np.argsort(labels, kind="stable")
+		bounds = np.cumsum(np.bincount(labels))[:-1]
+		return [component.tolist() for component in np.split(order, bounds)]
+
+	"""
+	Returns the variables and constraints of a part of the crossword, in the
+	same format as getVariables() and getConstraints(), with the variables
+	renumbered in the order given. Crossings with other variables are dropped
+
+	Previously a successful call to parse() must be done
+
+	@param 	variables 	indexes of the variables of the part
+	@return tuple (variables, constraints) of the part
+	"""
+	def getSubproblem(self, variables):
+		return self.getConstraintGraph().getSubgraph(variables).toLists()
+
 	"""
 	Returns the crossword as a list of unassigned variables
 
@@ -390,86 +876,244 @@ class Crossword(object):
 		return self._from2DVars[orient][num-1]
 
 	"""
-	Reads the crossword finding the variables that must be filled and fills in a
-	new crossword all the variables. Uses the following attributes
-		_crossword
-		_variables
-		_from2DVars
-		_from1DVars
-	attributes with their appropiate values
+	Returns the map from the cells of the crossword to the letters of the
+	variables that fill them. Words are written starting in the first numbered
+	cell of each sequence of non-empty cells whose number has a variable, first
+	by rows and then by columns, so vertical variables overwrite the
+	horizontal ones in the cells they share
+
+	The map is built the first time it's needed after parsing, so filling the
+	crossword with a solution is a single gather of letters
+
+	Previously a successful call to parse() must be done
+
+	@return tuple of arrays (cells, variables, offsets, sizes): index of each
+			cell filled in the flattened crossword, the variable that fills it
+			and the position of the letter in the variable, and the minimum
+			number of letters each variable needs
+	"""
+	def getCellMap(self):
+		assert self._hasParsed
+		if self._cellMap is None:
+			self._cellMap = self._mapCells()
+		return self._cellMap
+
+	"""
+	Builds the map from the cells of the crossword to the letters of the
+	variables that fill them. See getCellMap
+
+	@return tuple of arrays (cells, variables, offsets, sizes)
+	"""
+	def _mapCells(self):
+		variables = np.full(self._rows*self._cols, -1, dtype=np.int64)
+		offsets = np.zeros(self._rows*self._cols, dtype=np.int64)
+		sizes = np.zeros(len(self._variables), dtype=np.int64)
+		numbered = self._cells == CELL_NUMBER
+		for orient in (ORIENT_HOR,ORIENT_VER):
+			lookup = np.array([-1 if index is VARIABLE_REAL_UNKOWN else index
+				for index in self._from2DVars[orient]], dtype=np.int64)
+			indexes = np.full(self._cells.shape, -1, dtype=np.int64)
+			indexes[numbered] = lookup[self._numbers[numbered]-1]
+			cells = self._cells
+			if orient == ORIENT_VER:
+				cells, indexes = cells.T, indexes.T
+			lines, firsts, lengths = self._findRuns(cells, indexes >= 0)
+			owners = np.repeat(np.arange(len(lengths)), lengths)
+			positions = np.arange(len(owners)) - \
+				np.repeat(np.cumsum(lengths)-lengths, lengths)
+			rows, cols = lines[owners], firsts[owners]+positions
+			if orient == ORIENT_VER:
+				rows, cols = cols, rows
+			owners = indexes[lines,firsts][owners]
+			variables[rows*self._cols+cols] = owners
+			offsets[rows*self._cols+cols] = positions
+			# letters overwritten are needed too
+			np.maximum.at(sizes, owners, positions+1)
+		cells = np.flatnonzero(variables >= 0)
+		variables, offsets = variables[cells], offsets[cells]
+		return cells, variables, offsets, sizes
+
+	"""
+	Fills in a new crossword all the variables, writing each letter in the
+	cells given by the map of cells (see getCellMap)
 
 	A successful call to read() and parse() must be done before calling this
 	method
 
-	@param 		variables filled to fill in the crossword
-	@throws 	ValueError 	if some character not allowed is found
+	@param 		variables 	filled variables (letter codes of each word) to
+							fill in the crossword
+	@param 		alphabet 	alphabet of the wordlist, where each letter is in
+							the position of its code (if None, codes are
+							code points)
+	@throws 	IndexError 	if some variable has less letters than cells
+	@return 	crossword as list of rows with the letters filled
 	"""
-	def applyVariables(self, variables):
+	def applyVariables(self, variables, alphabet=None):
 		assert self._hasParsed
 		assert len(self._variables) == len(variables)
-		# init variables
-		varsize = 0
-		orient = None
-		filled_crossword = [[CROSSWORD_CELL_EMPTY for __ in range(self._cols)]\
-		 for _ in range(self._rows)]
-		word = ""
-
-		# parses the current cell to add constraint / variable
-		"""
-		Given the i,j coordinates of the crossword of the cell, parses the
-		content of the cell and modifies the function current variable read,
-		and variable number in order to add variables and constraints
-
-		@param 	i 	crossword row index (0-based)
-		@param 	j 	crossword col index (0-based)
-		"""
-		def __parseCell(i,j):
-			nonlocal word
-			nonlocal orient
-			nonlocal varsize
-			cell = self._crossword[i][j]
-			if varsize:
-				# reading a variable
-				if cell == CROSSWORD_CELL_WORD or isInteger(cell):
-					filled_crossword[i][j] = chr(word[varsize])
-					varsize += 1
-				elif cell == CROSSWORD_CELL_EMPTY:
-					varsize = 0
-			else:
-				# not reading variable
-				# empty field / other orientation word
-				if cell == CROSSWORD_CELL_EMPTY or \
-					cell == CROSSWORD_CELL_WORD:
-					return
-				# numeric field
-				elif isInteger(cell):
-					index = self._from2DVars[orient][int(cell)-1]
-					if index ==	VARIABLE_REAL_UNKOWN:
-						return
-					word = variables[index]
-					filled_crossword[i][j] = chr(word[varsize])
-					varsize += 1
-				# field unknown
-				else:
-					raise ValueError("unknown cell value %s "%(cell)
-					+"while parsing crossword cell [%d][%d]"%(i+1,j+1))
-
-		# read horizontal
-		orient = ORIENT_HOR
-		for i in range(self._rows):
-			for j in range(self._cols):
-				__parseCell(i,j)
-			# end of row
-			varsize = 0
-
-		# read vertical
-		orient = ORIENT_VER
-		for j in range(self._cols):
-			for i in range(self._rows):
-				__parseCell(i,j)
-			# end of col
-			varsize = 0
-		return filled_crossword
+		cells, owners, offsets, sizes = self.getCellMap()
+		lengths = np.array([len(word) for word in variables], dtype=np.int64)
+		short = np.flatnonzero(lengths < sizes)
+		if len(short):
+			raise IndexError("variable %s has %d letters but fills %d cells"%(
+				self.getVariableString(short[0]),lengths[short[0]],
+				sizes[short[0]]))
+		codes = np.concatenate([np.zeros(0, dtype=np.int64)] +
+			[np.asarray(word) for word in variables])
+		letters = codes[(np.cumsum(lengths)-lengths)[owners] + offsets]
+		if alphabet is not None:
+			letters = np.array(list(alphabet), dtype=object)[letters]
+		else:
+			letters = letters.astype(np.uint32).view("U1")
+		filled_crossword = np.full(self._rows*self._cols,
+			CROSSWORD_CELL_EMPTY, dtype=object)
+		filled_crossword[cells] = letters
+		return filled_crossword.reshape((self._rows,self._cols)).tolist()
+
+	"""
+	Stacks many solutions of the crossword into a matrix with the letters of
+	each solution in a row, the words of the variables one after the other
+
+	@param 		solutions 	list of solutions, each one a list with the
+							letter codes of the word of each variable, or
+							solutions already stacked
+	@throws 	ValueError 	if the words don't have the lengths of the
+							variables
+	@return 	tuple (uint8 matrix of letters, array with the column where
+				the word of each variable starts)
+	"""
+	def _stackSolutions(self, solutions):
+		lengths = self.getConstraintGraph().getVariables()["length"].astype(
+			np.int64)
+		if isinstance(solutions, np.ndarray) and solutions.ndim == 2:
+			codes = solutions.astype(np.uint8, copy=False)
+		else:
+			codes = np.concatenate([np.zeros(0, dtype=np.uint8)] +
+				[word for solution in solutions for word in solution]).astype(
+				np.uint8, copy=False)
+		if codes.size != len(solutions)*lengths.sum():
+			raise ValueError("solutions have %d letters, %d expected"%(
+				codes.size,len(solutions)*lengths.sum()))
+		return codes.reshape((len(solutions),lengths.sum())), \
+			np.cumsum(lengths)-lengths
+
+	"""
+	Renders many solutions of the crossword at once into a stack of matrices
+	of letter codes, one matrix per solution. Cells that are not part of any
+	variable get the empty code
+
+	A successful call to read() and parse() must be done before calling this
+	method
+
+	@param 		solutions 	list of solutions, each one a list with the
+							letter codes of the word of each variable, or
+							matrix with the words of each solution stacked in
+							a row
+	@param 		empty 		code to give to the cells without variable
+	@throws 	ValueError 	if the words don't have the lengths of the
+							variables
+	@return 	uint8 array of shape (solutions, rows, cols)
+	"""
+	def renderSolutions(self, solutions, empty=RENDER_EMPTY):
+		assert self._hasParsed
+		cells, owners, offsets, _ = self.getCellMap()
+		codes, starts = self._stackSolutions(solutions)
+		rendered = np.full((len(codes),self._rows*self._cols), empty,
+			dtype=np.uint8)
+		rendered[:,cells] = codes[:,starts[owners] + offsets]
+		return rendered.reshape((len(codes),self._rows,self._cols))
+
+	"""
+	Verifies many solutions of the crossword at once: checks that the letters
+	of every crossing are the same and, if given, that every word is in the
+	wordlist and has the letters fixed by the pre-filled cells and the seeds
+
+	A successful call to read() and parse() must be done before calling this
+	method
+
+	@param 		solutions 	list of solutions, each one a list with the
+							letter codes of the word of each variable, or
+							matrix with the words of each solution stacked in
+							a row
+	@param 		index 		positional letter index of the wordlist to check
+							the words are in (not checked if not given)
+	@param 		fixed 		letters fixed in each variable, as lists of
+							(position, letter code) tuples encoded like the
+							ones the solvers are given (not checked if not
+							given)
+	@throws 	ValueError 	if the words don't have the lengths of the
+							variables
+	@return 	tuple (passed, crossings, words, letters): boolean array
+				telling if each solution is valid, array of rows (solution,
+				variable, pos, other variable, other pos) with the crossings
+				with different letters, array of rows (solution, variable)
+				with the words not in the wordlist, and array of rows
+				(solution, variable, pos) with the letters different from
+				the fixed ones
+	"""
+	def verifySolutions(self, solutions, index=None, fixed=None):
+		assert self._hasParsed
+		codes, starts = self._stackSolutions(solutions)
+		graph = self.getConstraintGraph()
+		# each crossing is stored in both variables, check it once
+		owners, neighbours = graph.getOwners(), graph.getNeighbours()
+		once = np.flatnonzero(owners < neighbours)
+		crossings = np.stack((owners[once], graph.getPositions()[once],
+			neighbours[once], graph.getNeighbourPositions()[once]), axis=1)\
+			.astype(np.int64)
+		puzzles, failed = np.nonzero(
+			codes[:,starts[crossings[:,0]]+crossings[:,1]] !=
+			codes[:,starts[crossings[:,2]]+crossings[:,3]])
+		crossings = np.column_stack((puzzles, crossings[failed]))
+		words = np.zeros((0,2), dtype=np.int64)
+		if index is not None:
+			lengths = graph.getVariables()["length"]
+			missing = []
+			for length in np.unique(lengths).tolist():
+				variables = np.flatnonzero(lengths == length)
+				columns = (starts[variables][:,None] + np.arange(length))\
+					.ravel()
+				found = index.find(length, codes[:,columns])
+				puzzles, unknown = np.nonzero(
+					found.reshape((len(codes),len(variables))) < 0)
+				missing.append(np.column_stack((puzzles, variables[unknown])))
+			words = np.concatenate([words] + missing).astype(np.int64)
+			words = words[np.lexsort((words[:,1], words[:,0]))]
+		letters = np.zeros((0,3), dtype=np.int64)
+		if fixed is not None:
+			pinned = np.array([(variable, pos, letter) for variable, fixed_var
+				in enumerate(fixed) for pos, letter in fixed_var],
+				dtype=np.int64).reshape((-1,3))
+			puzzles, failed = np.nonzero(
+				codes[:,starts[pinned[:,0]]+pinned[:,1]] != pinned[:,2])
+			letters = np.column_stack((puzzles, pinned[failed,:2]))\
+				.astype(np.int64)
+		passed = np.ones(len(codes), dtype=bool)
+		passed[crossings[:,0]] = False
+		passed[words[:,0]] = False
+		passed[letters[:,0]] = False
+		return passed, crossings, words, letters
+
+	"""
+	Verifies a solution of the crossword, see verifySolutions
+
+	@param 		solution 	list with the letter codes of the word of each
+							variable
+	@param 		index 		positional letter index of the wordlist to check
+							the words are in (not checked if not given)
+	@param 		fixed 		letters fixed in each variable, encoded (not
+							checked if not given)
+	@return 	tuple (passed, crossings, words, letters): True if the
+				solution is valid, array of rows (variable, pos, other
+				variable, other pos) with the crossings with different
+				letters, array of the variables whose words are not in the
+				wordlist, and array of rows (variable, pos) with the letters
+				different from the fixed ones
+	"""
+	def verifySolution(self, solution, index=None, fixed=None):
+		passed, crossings, words, letters = self.verifySolutions([solution],
+			index, fixed)
+		return bool(passed[0]), crossings[:,1:], words[:,1], letters[:,1:]
 
 	"""
 	Returns a human-readable identification given the index of a variable
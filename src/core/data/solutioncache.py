@@ -0,0 +1,93 @@
+import os
+import numpy as np
+from ..helpers import binfile
+
+# constants
+"""
+Extension of the files where solutions are stored
+"""
+SOLUTION_EXT = ".solution"
+
+"""
+Version of the solution file format, files with other versions are ignored
+"""
+SOLUTION_VERSION = 1
+
+"""
+Stores the solutions found for crosswords in a directory, a file per solution,
+so a crossword with the same structure (see Crossword.getStructureHash) solved
+with the same words (see WordList.getHash) gets its solution back without
+searching again, even if it's renumbered or comes from another file
+"""
+class SolutionCache(object):
+	"""
+	@attr 	_directory 	directory where the solutions are stored
+	"""
+	__slots__ = ["_directory"]
+
+	"""
+	Initializes the cache over a directory, created if it doesn't exist when
+	storing the first solution
+
+	@param 	directory 	directory to store the solutions in
+	"""
+	def __init__(self, directory):
+		self._directory = directory
+
+	"""
+	Returns the file where the solution of a structure with a wordlist is
+	stored
+
+	@param 	structure 	hash of the structure of the crossword
+	@param 	words 		hash of the wordlist
+	@return filename of the solution
+	"""
+	def getFilename(self, structure, words):
+		return os.path.join(self._directory, "%s-%s%s"%(structure, words,
+			SOLUTION_EXT))
+
+	"""
+	Looks for the solution of a structure with a wordlist
+
+	@param 	structure 	hash of the structure of the crossword
+	@param 	words 		hash of the wordlist
+	@return list with the letter codes of the word of each variable, or None
+			if no solution is stored
+	"""
+	def get(self, structure, words):
+		try:
+			header, arrays = binfile.read(self.getFilename(structure, words))
+		except (OSError, ValueError):
+			return None
+		if header.get("version") != SOLUTION_VERSION or \
+			header.get("structure") != structure or \
+			header.get("words") != words:
+			return None
+		if not len(arrays["lengths"]):
+			return []
+		offsets = np.cumsum(arrays["lengths"])[:-1]
+		return np.split(arrays["codes"], offsets)
+
+	"""
+	Stores the solution of a structure with a wordlist
+
+	@param 	structure 	hash of the structure of the crossword
+	@param 	words 		hash of the wordlist
+	@param 	solution 	list with the letter codes of the word of each
+						variable
+	@throws OSError 	if unable to write the solution
+	@return self
+	"""
+	def put(self, structure, words, solution):
+		os.makedirs(self._directory, exist_ok=True)
+		header = {
+			"version":SOLUTION_VERSION,
+			"structure":structure,
+			"words":words}
+		arrays = {
+			"lengths":np.array([len(word) for word in solution],
+				dtype=np.int64),
+			"codes":np.concatenate([np.zeros(0, dtype=np.uint8)] +
+				list(solution)).astype(np.uint8, copy=False)}
+		binfile.write(self.getFilename(structure, words), header, arrays)
+		return self
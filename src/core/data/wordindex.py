@@ -0,0 +1,527 @@
+import numpy as np
+
+# constants
+"""
+Number of different values a letter can take in the word matrices
+"""
+LETTERS_MAX = 256
+
+"""
+Value in the letter lookup tables meaning the letter is not in the index
+"""
+LETTER_MISSING = -1
+
+"""
+Minimum number of words added after building the postings of a length that
+forces to rebuild them (they are also rebuilt if more than an eighth of the
+words have been added after building them)
+"""
+PENDING_MIN = 4096
+
+"""
+Positional index of a wordlist: for each word length, position in the word and
+letter, stores a packed bitmask of the words of that length having that letter
+in that position, so filtering the words that fit a letter in a position is a
+single AND against a precomputed mask instead of scanning a column of words
+
+It also stores, for each length and position, the words sorted by the letter
+they have in that position, so queries for words with some fixed letters only
+visit the words that have one of those letters
+
+The index follows the changes of the wordlist: added words are set into the
+masks and checked apart from the postings till they are rebuilt, and removed
+words (tombstones in the alive masks of the wordlist) are cleared from the
+masks and skipped when querying
+
+The masks and postings can be exported as arrays and set into another index of
+the same words, so they are stored in the compiled cache of the wordlist and
+not built again by every process
+"""
+class WordIndex(object):
+	"""
+	@attr 	_wordlist 	list of word matrices by length the index refers to
+	@attr 	_alive 		list of masks by length telling which words have not
+						been removed (None if no word of that length has)
+	@attr 	_letters 	for each length, lookup table that maps a letter to
+						its row in the masks of that length (or
+						LETTER_MISSING if no word of that length has it)
+	@attr 	_masks 		for each length, array of packed bitmasks with shape
+						(length, letters, capacity/8), or None if not built yet
+	@attr 	_postings 	for each length, tuple (words, offsets, count) where
+						words[pos] are the indexes of the first count words
+						sorted by their letter in pos, and the words with the
+						letter of row r in pos are
+						words[pos][offsets[pos,r]:offsets[pos,r+1]]
+						or None if not built yet
+	@attr 	_keys 		for each length, tuple (keys, rows, count) where keys
+						are the first count words as byte strings sorted, and
+						rows their indexes, or None if not built yet
+	@attr 	_shared 	lengths whose masks are shared with other indexes, so
+						they have to be copied before changing them
+	"""
+	__slots__ = ["_wordlist","_alive","_letters","_masks","_postings","_keys",
+	"_shared"]
+
+	"""
+	Initializes the index of the given wordlist. Masks of each length are built
+	the first time they are needed
+
+	@param 	wordlist 	list of word matrices, indexed by word length
+	@param 	alive 		list of masks of words not removed, indexed by word
+						length (missing or None means no word removed)
+	"""
+	def __init__(self, wordlist, alive=None):
+		self._wordlist = wordlist
+		self._alive = alive if alive is not None else []
+		self._letters = []
+		self._masks = []
+		self._postings = []
+		self._keys = []
+		self._shared = set()
+		self._resize(len(wordlist))
+
+	"""
+	Enlarges the per-length lists of the index so they fit the given number of
+	lengths
+
+	@param 	lengths 	number of lengths to fit
+	"""
+	def _resize(self, lengths):
+		for attr in (self._letters, self._masks, self._postings, self._keys):
+			attr.extend([None for _ in range(lengths - len(attr))])
+
+	"""
+	Returns the mask of the words not removed of the given length, or None if
+	no word of that length has been removed
+
+	@param 	length 	length of the words
+	@return boolean array or None
+	"""
+	def _getAlive(self, length):
+		if length >= len(self._alive) or self._alive[length] is None:
+			return None
+		return self._alive[length][:len(self._wordlist[length])]
+
+	"""
+	Returns the words of the given length as a matrix and builds the lookup
+	table of the letters they use if not built yet
+
+	@param 	length 	length of the words
+	@return matrix of words
+	"""
+	def _getWords(self, length):
+		self._resize(length+1)
+		words = np.asarray(self._wordlist[length], dtype=np.uint8)\
+			.reshape((-1,length))
+		if self._letters[length] is None:
+			present = np.zeros(LETTERS_MAX, dtype=bool)
+			present[words.ravel()] = True
+			letters = np.full(LETTERS_MAX, LETTER_MISSING, dtype=np.int16)
+			letters[present] = np.arange(np.count_nonzero(present))
+			self._letters[length] = letters
+		return words
+
+	"""
+	Builds the masks of the words of the given length
+
+	@param 	length 	length of the words to index
+	"""
+	def _build(self, length):
+		words = self._getWords(length)
+		letters = self._letters[length]
+		present = letters != LETTER_MISSING
+		alive = self._getAlive(length)
+		masks = np.empty((length, np.count_nonzero(present),
+			(len(words)+7)//8), dtype=np.uint8)
+		hits = np.empty((masks.shape[1], len(words)), dtype=bool)
+		for pos in range(length):
+			hits[:] = False
+			hits[letters[words[:,pos]], np.arange(len(words))] = True
+			if alive is not None:
+				hits &= alive
+			masks[pos] = np.packbits(hits, axis=1)
+		self._masks[length] = masks
+
+	"""
+	Builds the postings of the words of the given length, this means, the word
+	indexes sorted by the letter in each position
+
+	@param 	length 	length of the words to index
+	"""
+	def _buildPostings(self, length):
+		words = self._getWords(length)
+		letters = self._letters[length]
+		count = np.count_nonzero(letters != LETTER_MISSING)
+		postings = np.empty((length, len(words)), dtype=np.uint32)
+		offsets = np.zeros((length, count+1), dtype=np.int64)
+		for pos in range(length):
+			rows = letters[words[:,pos]]
+			postings[pos] = np.argsort(rows, kind="stable")
+			offsets[pos,1:] = np.cumsum(np.bincount(rows, minlength=count))
+		self._postings[length] = (postings, offsets, len(words))
+
+	"""
+	Builds the sorted keys of the words of the given length not removed, used
+	to find whole words
+
+	@param 	length 	length of the words to index
+	"""
+	def _buildKeys(self, length):
+		words = self._getWords(length)
+		keys = np.ascontiguousarray(words).view(np.dtype((np.void, length)))\
+			.ravel()
+		rows = np.argsort(keys, kind="stable").astype(np.uint32)
+		alive = self._getAlive(length)
+		if alive is not None:
+			rows = rows[alive[rows]]
+		self._keys[length] = (keys[rows], rows, len(words))
+
+	"""
+	Builds everything not built yet of the index for the given length, so
+	indexes derived from this one can share it
+
+	@param 	length 	length of the words to index
+	"""
+	def build(self, length):
+		self._resize(length+1)
+		if not length or length >= len(self._wordlist):
+			return
+		if self._masks[length] is None:
+			self._build(length)
+		if self._postings[length] is None:
+			self._buildPostings(length)
+		if self._keys[length] is None:
+			self._buildKeys(length)
+
+	"""
+	Returns the arrays of the masks and postings of every length, building the
+	ones not built yet, so they can be stored and set into another index of
+	the same words with setArrays
+
+	@return dictionary of name -> numpy array
+	"""
+	def getArrays(self):
+		arrays = {}
+		for length in range(1, len(self._wordlist)):
+			self._resize(length+1)
+			if self._masks[length] is None:
+				self._build(length)
+			if self._postings[length] is None:
+				self._buildPostings(length)
+			postings, offsets, _ = self._postings[length]
+			arrays.update({"letters_%d"%length:self._letters[length],
+				"masks_%d"%length:self._masks[length],
+				"postings_%d"%length:postings, "offsets_%d"%length:offsets})
+		return arrays
+
+	"""
+	Sets the masks and postings returned by getArrays of an index of the same
+	words, instead of building them. Arrays may be read-only (memory-mapped),
+	so masks are copied before changing them
+
+	@param 	arrays 	dictionary of name -> numpy array
+	"""
+	def setArrays(self, arrays):
+		lengths = [int(name[len("masks_"):]) for name in arrays
+			if name.startswith("masks_")]
+		for length in lengths:
+			self._resize(length+1)
+			postings = arrays["postings_%d"%length]
+			self._letters[length] = arrays["letters_%d"%length]
+			self._masks[length] = arrays["masks_%d"%length]
+			self._postings[length] = (postings, arrays["offsets_%d"%length],
+				postings.shape[1])
+			self._shared.add(length)
+
+	"""
+	Creates an index for another wordlist whose matrices start with the words
+	of the matrices of this one (maybe followed by other words), sharing with
+	it what this index has built. Masks shared are copied by any of both
+	indexes before changing them, and words that don't match are expected to
+	be added or removed from the new index afterwards
+
+	@param 	wordlist 	list of word matrices of the new index
+	@param 	alive 		list of masks of words not removed of the new index
+	@return new index
+	"""
+	def derive(self, wordlist, alive=None):
+		index = WordIndex(wordlist, alive)
+		index._resize(len(self._letters))
+		for attr in ("_letters", "_masks", "_postings", "_keys"):
+			built = getattr(self, attr)[:len(getattr(index, attr))]
+			getattr(index, attr)[:len(built)] = built
+		shared = {length for length in range(min(len(self._masks),
+			len(index._masks))) if self._masks[length] is not None}
+		self._shared |= shared
+		index._shared |= shared
+		return index
+
+	"""
+	Copies the masks of a length if they are shared with another index, so
+	they can be changed
+
+	@param 	length 	length of the words
+	"""
+	def _own(self, length):
+		if length in self._shared:
+			self._shared.discard(length)
+			if self._masks[length] is not None:
+				self._masks[length] = self._masks[length].copy()
+
+	"""
+	Drops everything built for the given length, so it's built again from the
+	wordlist the next time it's needed
+
+	@param 	length 	length of the words
+	"""
+	def invalidate(self, length):
+		self._resize(length+1)
+		self._letters[length] = None
+		self._masks[length] = None
+		self._postings[length] = None
+		self._keys[length] = None
+		self._shared.discard(length)
+
+	"""
+	Updates the index after a word has been written in the given row of the
+	matrix of its length. If the word has a letter never seen in that length,
+	the length is invalidated instead
+
+	@param 	length 	length of the word
+	@param 	row 	row of the word in the matrix of its length
+	"""
+	def addWord(self, length, row):
+		self.addWords(length, [row])
+
+	"""
+	Updates the index after some words have been written in the given rows of
+	the matrix of their length. If a word has a letter never seen in that
+	length, the length is invalidated instead
+
+	@param 	length 	length of the words
+	@param 	rows 	rows of the words in the matrix of their length
+	"""
+	def addWords(self, length, rows):
+		self._resize(length+1)
+		rows = np.asarray(rows, dtype=np.intp)
+		for attr in (self._postings, self._keys):
+			built = attr[length]
+			if built is not None and len(self._wordlist[length]) - built[2] > \
+				max(PENDING_MIN, built[2]//8):
+				attr[length] = None
+		if self._letters[length] is None or not len(rows):
+			return
+		letters = self._letters[length][
+			np.asarray(self._wordlist[length][rows], dtype=np.uint8)]
+		if (letters == LETTER_MISSING).any():
+			# keys don't depend on the letters found
+			keys = self._keys[length]
+			self.invalidate(length)
+			self._keys[length] = keys
+			return
+		if self._masks[length] is not None:
+			self._own(length)
+			masks = self._masks[length]
+			last = rows.max()
+			if last >= masks.shape[2]*8:
+				grown = np.zeros(masks.shape[:2]+(max(masks.shape[2]*2,
+					last//8+1),), dtype=np.uint8)
+				grown[:,:,:masks.shape[2]] = masks
+				self._masks[length] = masks = grown
+			bits = (0x80 >> rows%8).astype(np.uint8)
+			for pos in range(length):
+				np.bitwise_or.at(masks[pos], (letters[:,pos], rows//8), bits)
+
+	"""
+	Updates the index after the word in the given row of the matrix of its
+	length has been removed (marked as not alive)
+
+	@param 	length 	length of the word
+	@param 	row 	row of the word in the matrix of its length
+	"""
+	def removeWord(self, length, row):
+		self.removeWords(length, [row])
+
+	"""
+	Updates the index after the words in the given rows of the matrix of their
+	length have been removed (marked as not alive)
+
+	@param 	length 	length of the words
+	@param 	rows 	rows of the words in the matrix of their length
+	"""
+	def removeWords(self, length, rows):
+		self._resize(length+1)
+		rows = np.asarray(rows, dtype=np.intp)
+		if self._masks[length] is None or not len(rows):
+			return
+		self._own(length)
+		masks = self._masks[length]
+		letters = self._letters[length][
+			np.asarray(self._wordlist[length][rows], dtype=np.uint8)]
+		bits = (~(0x80 >> rows%8) & 0xFF).astype(np.uint8)
+		for pos in range(length):
+			np.bitwise_and.at(masks[pos], (letters[:,pos], rows//8), bits)
+
+	"""
+	Finds whole words in the matrix of their length, skipping removed words
+
+	@param 	length 	length of the words
+	@param 	words 	matrix of letter codes with a word per row
+	@return array with the row of each word in the matrix of its length, or
+			-1 for the words not found
+	"""
+	def find(self, length, words):
+		self._resize(length+1)
+		words = np.ascontiguousarray(words, dtype=np.uint8).reshape((-1,length))
+		found = np.full(len(words), -1, dtype=np.int64)
+		if length >= len(self._wordlist) or not length or not len(words):
+			return found
+		if self._keys[length] is None:
+			self._buildKeys(length)
+		keys, rows, built = self._keys[length]
+		matrix = self._getWords(length)
+		alive = self._getAlive(length)
+		queries = words.view(keys.dtype).ravel()
+		parts = [(keys, rows, 0)]
+		# words added after building the keys
+		if built < len(matrix):
+			added = np.ascontiguousarray(matrix[built:]).view(keys.dtype)\
+				.ravel()
+			order = np.argsort(added, kind="stable").astype(np.uint32)
+			parts.append((added[order], order, built))
+		for keys, rows, offset in parts:
+			missing = np.flatnonzero(found < 0)
+			pos = np.searchsorted(keys, queries[missing])
+			hit = pos < len(keys)
+			hit[hit] = keys[pos[hit]] == queries[missing[hit]]
+			missing, pos = missing[hit], pos[hit]
+			found[missing] = rows[pos].astype(np.int64) + offset
+			if alive is None:
+				continue
+			# removed words found: look for copies of them not removed
+			dead = np.flatnonzero(~alive[found[missing]])
+			ends = np.searchsorted(keys, queries[missing[dead]], side="right")
+			for i, end in zip(dead.tolist(), ends.tolist()):
+				copies = rows[pos[i]:end].astype(np.int64) + offset
+				copies = copies[alive[copies]]
+				found[missing[i]] = copies[0] if len(copies) else -1
+		return found
+
+	"""
+	Returns the sorted indexes of the words of the given length that have the
+	letter given in the position given, including removed words and excluding
+	the words added after building the postings
+
+	@param 	length 	length of the words
+	@param 	pos 	position of the letter in the word (0-based)
+	@param 	letter 	letter value the words must have
+	@return array of word indexes
+	"""
+	def getWords(self, length, pos, letter):
+		self._resize(length+1)
+		if self._postings[length] is None:
+			self._buildPostings(length)
+		postings, offsets, _ = self._postings[length]
+		row = self._letters[length][letter]
+		if row == LETTER_MISSING:
+			return postings[pos,:0]
+		return postings[pos,offsets[pos,row]:offsets[pos,row+1]]
+
+	"""
+	Returns the sorted indexes of the words of the given length that have the
+	given letters fixed in the given positions. The query starts from the words
+	having the least common of the fixed letters and checks the rest of letters
+	just on them, so its cost depends on the number of candidates and not on
+	the number of words
+
+	@param 	length 	length of the words
+	@param 	fixed 	dictionary of position -> letter value
+	@return array of word indexes
+	"""
+	def match(self, length, fixed):
+		if length >= len(self._wordlist):
+			return np.zeros(0, dtype=np.uint32)
+		alive = self._getAlive(length)
+		if not fixed:
+			candidates = np.arange(len(self._wordlist[length]),dtype=np.uint32)
+			return candidates if alive is None else candidates[alive]
+		postings = sorted(((self.getWords(length, pos, letter), pos, letter)
+			for pos, letter in fixed.items()), key=lambda x: len(x[0]))
+		candidates = postings[0][0]
+		words = self._getWords(length)
+		# words added after building the postings
+		built = self._postings[length][2]
+		if built < len(words):
+			added = np.arange(built, len(words), dtype=np.uint32)
+			candidates = np.concatenate((candidates,
+				added[words[added,postings[0][1]] == postings[0][2]]))
+		for _, pos, letter in postings[1:]:
+			if not len(candidates):
+				break
+			candidates = candidates[words[candidates,pos] == letter]
+		if alive is not None:
+			candidates = candidates[alive[candidates]]
+		return candidates
+
+	"""
+	Returns the packed bitmask of the words of the given length that have the
+	letter given in the position given, building the masks of that length if
+	needed
+
+	@param 	length 	length of the words
+	@param 	pos 	position of the letter in the word (0-based)
+	@param 	letter 	letter value the words must have
+	@return packed bitmask (as uint8 array) or None if no word matches
+	"""
+	def getPackedMask(self, length, pos, letter):
+		self._resize(length+1)
+		if self._masks[length] is None:
+			self._build(length)
+		row = self._letters[length][letter]
+		if row == LETTER_MISSING:
+			return None
+		return self._masks[length][pos,row]
+
+	"""
+	Returns the boolean mask of the words of the given length that have the
+	letter given in the position given, so a domain of words of that length
+	can be filtered by and-ing it with the mask. Removed words never match
+
+	@param 	length 	length of the words
+	@param 	pos 	position of the letter in the word (0-based)
+	@param 	letter 	letter value the words must have
+	@return boolean array with an item per word of that length
+	"""
+	def getMask(self, length, pos, letter):
+		packed = self.getPackedMask(length, pos, letter)
+		if packed is None:
+			return np.zeros(len(self._wordlist[length]), dtype=bool)
+		return np.unpackbits(packed, count=len(self._wordlist[length]))\
+			.view(bool)
+
+	"""
+	Returns a new domain for a variable of the given length, this means, a
+	boolean array with the words of that length that can be assigned to it (all
+	but the removed ones). Lengths without words give empty domains
+
+	@param 	length 	length of the words
+	@return boolean array with an item per word of that length
+	"""
+	def getDomain(self, length):
+		if length >= len(self._wordlist):
+			return np.zeros(0, dtype=bool)
+		alive = self._getAlive(length)
+		if alive is None:
+			return np.ones(len(self._wordlist[length]), dtype=bool)
+		return np.array(alive, copy=True)
+
+	"""
+	Returns the number of words of the given length in the index
+
+	@param 	length 	length of the words
+	@return number of words
+	"""
+	def getCount(self, length):
+		if length >= len(self._wordlist):
+			return 0
+		return len(self._wordlist[length])
@@ -1,4 +1,11 @@
 import numpy as np
+import logging
+import re
+import codecs
+import unicodedata
+import hashlib
+from ..helpers import binfile
+from .wordindex import WordIndex
 
 # constants
 """
@@ -11,37 +18,182 @@ Number of words to save as tail
 """
 WORDS_TAIL = WORDS_HEAD
 
+"""
+Extension added to the wordlist filename to store its compiled cache
+"""
+CACHE_EXT = ".cache"
+
+"""
+Extension added before the cache extension when diacritics are folded, so
+folded and unfolded caches of the same file don't overwrite each other
+"""
+CACHE_FOLD_EXT = ".fold"
+
+"""
+Version of the compiled cache format, caches with other versions are rebuilt
+"""
+CACHE_VERSION = 4
+
+"""
+Whether to use compiled caches by default
+"""
+CACHE_DEFAULT = True
+
+"""
+Whether to memory-map the compiled cache by default
+"""
+MMAP_DEFAULT = False
+
+"""
+Whether to fold diacritics (remove accents and other marks) by default
+"""
+FOLD_DEFAULT = False
+
+"""
+Encodings detected by their byte order mark, checked in order
+"""
+ENCODINGS_BOM = (
+	(codecs.BOM_UTF32_LE, "utf-32"),
+	(codecs.BOM_UTF32_BE, "utf-32"),
+	(codecs.BOM_UTF8, "utf-8-sig"),
+	(codecs.BOM_UTF16_LE, "utf-16"),
+	(codecs.BOM_UTF16_BE, "utf-16"))
+
+"""
+Encoding tried when no byte order mark is found, and encoding used if the file
+can't be decoded with it
+"""
+ENCODING_DEFAULT = "utf-8"
+ENCODING_FALLBACK = "ISO-8859-1"
+
+"""
+Combining marks removed when folding diacritics
+"""
+COMBINING_MARKS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff"
+	"\u20d0-\u20ff\ufe20-\ufe2f]")
+
+"""
+Maximum number of different letters a wordlist can have, as letters are
+stored as uint8 codes
+"""
+ALPHABET_MAX = 256
+
+"""
+Code points that mark the end of a line and a carriage return in wordlist files
+"""
+LINE_END = ord('\n')
+LINE_CR = ord('\r')
+
+"""
+Character that separates a word from its weight in weighted wordlist files
+(lines like "word<TAB>weight")
+"""
+WEIGHT_SEPARATOR = '\t'
+
+"""
+Weight of the words that have no weight in weighted wordlists
+"""
+WEIGHT_DEFAULT = 0.0
+
+"""
+Number of bytes of the wordlist file to read and decode at once
+"""
+READ_CHUNK = 1 << 20
+
+"""
+Number of words to gather at once when building the length matrices
+"""
+PARSE_BLOCK = 1 << 16
+
+"""
+Character that matches any letter in a pattern query
+"""
+MATCH_WILDCARD = '?'
+
+"""
+Minimum number of rows to reserve when growing the matrix of a length
+"""
+GROW_MIN = 16
+
+"""
+Ratio of removed words over the words of a length that triggers compacting
+the matrix of that length
+"""
+COMPACT_RATIO = 0.25
+
+LOGGER = logging.getLogger(__name__)
+
 """
 Defines a class for loading and manipulating lists of words that can be used
 to solve the crossword
 """
 class WordList(object):
 	"""
-	@attr	_wordlist	first, list of words loaded from the specified file
-						after parse, list of lists separed by word length
-						containing word lists in each index depending on their
-						length
+	@attr	_wordlist	after parse, list of matrices separed by word length
+						containing the words of the length of each index
 	@attr 	_wordcount 	number of words in the dictionary
 	@attr 	_filename	file name of the loaded word list
 	@attr 	_hasRead 	True if has read the file properly
 	@attr 	_hasParsed 	True if has parsed the words properly
 	@attr 	_head 		First words found
 	@attr 	_tail 		Last words found
+	@attr 	_cache 		True if the compiled cache has to be used
+	@attr 	_fromCache 	True if the parsed words have been loaded from cache
+	@attr 	_mmap 		True if the parsed words have to be memory-mapped
+						from the cache, sharing them with other processes
+	@attr 	_index 		positional letter index of the parsed words
+	@attr 	_buffers 	for each length, matrix where the words of that length
+						are stored, with free rows at the end to add words
+	@attr 	_alive 		for each length, mask of words of that length that
+						have not been removed, or None if none removed
+	@attr 	_removed 	for each length, number of words removed but still
+						in the matrix of that length (tombstones)
+	@attr 	_fold 		True if diacritics are folded while reading
+	@attr 	_encoding 	encoding the file has been read with
+	@attr 	_alphabet 	string with the letters of the wordlist, where the
+						position of each letter is the code it's stored with
+						in the matrices
+	@attr 	_codes 		dictionary that maps each letter to its code
+	@attr 	_weights 	for each length, weight of each word in the matrix of
+						that length (words are sorted by decreasing weight
+						when read), or None if the wordlist has no weights
 	"""
 	__slots__ = ["_wordlist","_filename","_wordcount","_hasRead","_hasParsed",
-	"_head","_tail"]
+	"_head","_tail","_cache","_fromCache","_mmap","_index","_buffers",
+	"_alive","_removed","_fold","_encoding","_alphabet","_codes",
+	"_weights"]
 
 	"""
 	Initializes an empty wordlist, with a filename to load when calling the read
 	method
 
 	@param 	filename	file name to load
+	@param 	cache 		if True, a compiled cache of the parsed words is stored
+						next to the file and loaded instead of reading and
+						parsing the file again while it's fresh
+	@param 	mmap 		if True, the parsed words are read-only views of the
+						memory-mapped cache instead of private copies, so all
+						processes using the same wordlist share a single
+						physical copy of it (implies using the cache)
+	@param 	fold 		if True, diacritics are removed from the letters
 	"""
-	def __init__(self, filename):
+	def __init__(self, filename, cache=CACHE_DEFAULT, mmap=MMAP_DEFAULT,
+		fold=FOLD_DEFAULT):
 		self._filename = filename
 		self._hasRead = False
 		self._wordcount = 0
 		self._hasParsed = False
+		self._cache = cache or mmap
+		self._mmap = mmap
+		self._fromCache = False
+		self._index = None
+		self._buffers = []
+		self._alive = []
+		self._removed = []
+		self._fold = fold
+		self._encoding = None
+		self._weights = None
+		self._setAlphabet("")
 
 	"""
 	Reads from the filename saved the word list and stores into a list of
@@ -51,56 +203,388 @@ class WordList(object):
 	@return 	self
 	"""
 	def read(self):
-		self._read()
+		self._fromCache = self._cache and self._loadCache()
+		if not self._fromCache:
+			self._read()
 		self._hasRead = True
 		return self
 
 	"""
-	Reads a file containing a word per line into a list
+	Reads a file containing a word per line, streaming it by chunks straight
+	into the matrices of each length, so no string is created per word and the
+	memory needed is about the size of the matrices plus a chunk
+
+	The encoding is detected by the byte order mark, or else UTF-8 is tried
+	and ISO-8859-1 is used if it fails. Then text is normalized, diacritics are
+	folded if asked, and the letters found are mapped to dense codes 0..k-1 in
+	the order of their code points
+
+	Lines can have a weight after the word, separed by a tabulation. If any
+	line has it, the words of each length are sorted by decreasing weight
+	(keeping the order of the file for equal weights)
 	"""
 	def _read(self):
+		with open(self._filename, 'rb') as f:
+			start = f.read(4)
+		encoding = ENCODING_DEFAULT
+		for bom, name in ENCODINGS_BOM:
+			if start.startswith(bom):
+				encoding = name
+				break
 		try:
-			self._wordlist = \
-				[line.rstrip('\n').rstrip('\r') for line in \
-				open(self._filename, 'r')]
-		except:
-			self._wordlist = \
-				[line.rstrip('\n').rstrip('\r') for line in \
-				open(self._filename, 'r',encoding = "ISO-8859-1")]
-		self._wordcount = len(self._wordlist)
-		self._head = self._wordlist[:WORDS_HEAD]
-		self._tail = self._wordlist[-WORDS_TAIL:]
-
-	"""
-	Parses the wordlist to transform them into a list of sublists, where each
-	sublist contains the number of words whose length is the index of that list
-	in the first list
+			self._readChunks(encoding)
+		except UnicodeDecodeError:
+			self._readChunks(ENCODING_FALLBACK)
+
+	"""
+	Reads the file by chunks with the given encoding. Each chunk is cut after
+	its last line end, and the rest is kept for the next chunk
+
+	@param 	encoding 	encoding to decode the file with
+	@raises UnicodeDecodeError 	if the file can't be decoded with it
+	"""
+	def _readChunks(self, encoding):
+		self._encoding = encoding
+		self._wordlist = []
+		self._index = None
+		self._buffers = []
+		self._alive = []
+		self._removed = []
+		self._weights = None
+		self._wordcount = 0
+		self._head = []
+		self._tail = []
+		self._setAlphabet("")
+		decoder = codecs.getincrementaldecoder(encoding)()
+		pending = ""
+		with open(self._filename, 'rb') as f:
+			while True:
+				chunk = f.read(READ_CHUNK)
+				text = pending + decoder.decode(chunk, final=not chunk)
+				if chunk:
+					cut = text.rfind('\n') + 1
+					text, pending = text[:cut], text[cut:]
+				if text:
+					self._readLines(self._normalize(text))
+				if not chunk:
+					break
+		self._sortAlphabet()
+		# release the rows reserved but not used
+		for length in range(len(self._wordlist)):
+			self._buffers[length].resize(self._wordlist[length].shape,
+				refcheck=False)
+			self._wordlist[length] = self._buffers[length]
+			if self._weights is not None:
+				self._weights[length].resize(len(self._wordlist[length]),
+					refcheck=False)
+				self._sortByWeight(length)
+
+	"""
+	Appends the lines of a chunk of text to the matrices of their lengths,
+	finding where each line starts and its length without creating a string
+	per line. New letters are added to the alphabet in the order they appear
+
+	@param 	text 	normalized text made of whole lines
+	@raises ValueError 	if the wordlist has too many different letters or
+						a weight is not a number
+	"""
+	def _readLines(self, text):
+		points = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+		# find lines
+		ends = np.flatnonzero(points == LINE_END)
+		if points[-1] != LINE_END:
+			ends = np.append(ends, len(points))
+		starts = np.empty_like(ends)
+		starts[:1] = 0
+		starts[1:] = ends[:-1] + 1
+		lengths = ends - starts
+		# strip carriage returns
+		strip = lengths > 0
+		while True:
+			strip[strip] = points[(starts + lengths - 1)[strip]] == LINE_CR
+			if not strip.any():
+				break
+			lengths -= strip
+			strip &= lengths > 0
+		# split weights
+		weights = None
+		separators = np.flatnonzero(points == ord(WEIGHT_SEPARATOR))
+		if len(separators):
+			first = np.searchsorted(separators, starts)
+			weighted = first < len(separators)
+			weighted[weighted] = separators[first[weighted]] < \
+				(starts + lengths)[weighted]
+			weighted = np.flatnonzero(weighted)
+			ends = starts + lengths
+			lengths[weighted] = separators[first[weighted]] - starts[weighted]
+			weights = np.full(len(starts), WEIGHT_DEFAULT, dtype=np.float32)
+			weights[weighted] = np.array([text[start+length+1:end]
+				for start, length, end in zip(starts[weighted].tolist(),
+				lengths[weighted].tolist(), ends[weighted].tolist())],
+				dtype=np.float64)
+			self._setWeighted()
+		# map letters found in words to codes
+		inword = np.zeros(len(points)+1, dtype=np.int8)
+		inword[starts] += 1
+		inword[starts + lengths] -= 1
+		inword = np.cumsum(inword[:-1], dtype=np.int8).view(bool)
+		letters = np.flatnonzero(np.bincount(points[inword])) \
+			if inword.any() else np.zeros(0, dtype=np.intp)
+		added = "".join([chr(letter) for letter in letters
+			if chr(letter) not in self._codes])
+		if len(self._alphabet) + len(added) > ALPHABET_MAX:
+			raise ValueError("wordlist has %d different letters, "%(
+			len(self._alphabet) + len(added))
+			+"only %d are allowed"%ALPHABET_MAX)
+		self._setAlphabet(self._alphabet + added)
+		codes = np.zeros(letters[-1]+1 if len(letters) else 1, dtype=np.uint8)
+		codes[letters] = [self._codes[chr(letter)] for letter in letters]
+		points = codes[np.minimum(points, len(codes)-1)]
+		# keep the first and last lines
+		lines = lambda rows: [self.decode(points[starts[i]:starts[i]+lengths[i]])
+			for i in rows]
+		if len(self._head) < WORDS_HEAD:
+			self._head += lines(range(min(WORDS_HEAD-len(self._head),
+				len(starts))))
+		self._tail = (self._tail + lines(range(max(0, len(starts)-WORDS_TAIL),
+			len(starts))))[-WORDS_TAIL:]
+		# bucket lines by length
+		counts = np.bincount(lengths)
+		order = np.argsort(lengths, kind="stable")
+		bounds = np.concatenate(([0], np.cumsum(counts)))
+		for length in np.flatnonzero(counts).tolist():
+			lines = order[bounds[length]:bounds[length+1]]
+			rows = starts[lines]
+			first = self._reserveRows(length, len(rows))
+			words = self._buffers[length][first:first+len(rows)]
+			offsets = np.arange(length)
+			for row in range(0, len(rows), PARSE_BLOCK):
+				block = rows[row:row+PARSE_BLOCK]
+				words[row:row+len(block)] = points[block[:,np.newaxis] + offsets]
+			if self._weights is not None:
+				self._weights[length][first:first+len(rows)] = \
+					WEIGHT_DEFAULT if weights is None else weights[lines]
+		self._wordcount += len(starts)
+
+	"""
+	Reserves rows at the end of the matrix of a length while reading, growing
+	its buffer in place by doubling its rows (pages reserved but not written
+	yet take no physical memory)
+
+	@param 	length 	length of the words
+	@param 	count 	number of rows to reserve
+	@return index of the first row reserved
+	"""
+	def _reserveRows(self, length, count):
+		self._prepareEdit(length)
+		size = len(self._wordlist[length])
+		buffer = self._buffers[length]
+		if size + count > len(buffer):
+			buffer.resize((max(size + count, len(buffer)*2, GROW_MIN), length),
+				refcheck=False)
+			if self._weights is not None:
+				self._weights[length].resize(len(buffer), refcheck=False)
+		self._wordlist[length] = buffer[:size+count]
+		return size
+
+	"""
+	Makes the wordlist weighted if it was not, giving the default weight to
+	the words it already has
+	"""
+	def _setWeighted(self):
+		if self._weights is None:
+			self._weights = [np.full(len(buffer), WEIGHT_DEFAULT,
+				dtype=np.float32) for buffer in self._buffers]
+
+	"""
+	Sorts the words of a length by decreasing weight, keeping the order they
+	had for equal weights
+
+	@param 	length 	length of the words to sort
+	"""
+	def _sortByWeight(self, length):
+		weights = self._weights[length][:len(self._wordlist[length])]
+		if not len(weights) or (weights[:-1] >= weights[1:]).all():
+			return
+		order = np.argsort(-weights, kind="stable")
+		self._wordlist[length][:] = self._wordlist[length][order]
+		weights[:] = weights[order]
+
+	"""
+	Sorts the alphabet read by code point, so codes don't depend on the order
+	letters appear in the file, and recodes the matrices read with it
+	"""
+	def _sortAlphabet(self):
+		alphabet = "".join(sorted(self._alphabet))
+		if alphabet == self._alphabet:
+			return
+		recode = np.zeros(ALPHABET_MAX, dtype=np.uint8)
+		recode[[self._codes[letter] for letter in alphabet]] = \
+			np.arange(len(alphabet))
+		for words in self._wordlist:
+			for row in range(0, len(words), PARSE_BLOCK):
+				words[row:row+PARSE_BLOCK] = recode[words[row:row+PARSE_BLOCK]]
+		self._setAlphabet(alphabet)
+
+	"""
+	Normalizes text to the form letters are stored in the wordlist: composed
+	characters, without diacritics if folding them
+
+	@param 	text 	text to normalize
+	@return normalized text
+	"""
+	def _normalize(self, text):
+		if text.isascii():
+			return text
+		if self._fold:
+			text = COMBINING_MARKS.sub("", unicodedata.normalize("NFD", text))
+		return unicodedata.normalize("NFC", text)
+
+	"""
+	Sets the alphabet of the wordlist, the letter in each position of the
+	alphabet is the letter stored with that code
+
+	@param 	alphabet 	string with the letters
+	"""
+	def _setAlphabet(self, alphabet):
+		self._alphabet = alphabet
+		self._codes = {letter:code for code, letter in enumerate(alphabet)}
+
+	"""
+	Returns the alphabet of the wordlist, a string where the letter in each
+	position is the letter stored with that code in the matrices
+
+	@return 	alphabet string
+	"""
+	def getAlphabet(self):
+		return self._alphabet
+
+	"""
+	Transforms a word (or a letter) into letter codes. Letters not in the
+	alphabet are added to it if extending it, or make the word not encodable
+
+	@param 	word 	word as a string or as letter codes
+	@param 	extend 	True to add unknown letters to the alphabet
+	@raises ValueError 	if the alphabet is full and has to be extended
+	@return array of letter codes or None if the word can't be encoded
+	"""
+	def encode(self, word, extend=False):
+		if not isinstance(word, str):
+			return np.asarray(word, dtype=np.uint8)
+		codes = []
+		for letter in self._normalize(word):
+			if letter not in self._codes:
+				if not extend:
+					return None
+				if len(self._alphabet) >= ALPHABET_MAX:
+					raise ValueError("unable to add letter %s, "%letter
+					+"alphabet is full")
+				self._setAlphabet(self._alphabet + letter)
+			codes.append(self._codes[letter])
+		return np.array(codes, dtype=np.uint8)
+
+	"""
+	Transforms letter codes back into a word
+
+	@param 	codes 	letter codes of the word
+	@return word as a string
+	"""
+	def decode(self, codes):
+		return "".join([self._alphabet[code] for code in codes])
+
+	"""
+	Finishes loading the wordlist: words are already split by length while
+	reading, so it just stores the compiled cache if it's used
 
 	@return 	self
 	"""
 	def parse(self):
 		assert self._hasRead
-		self._parse()
+		if not self._fromCache:
+			if self._cache and self._saveCache() and self._mmap:
+				# replace private copies with the shared mapping
+				self._fromCache = self._loadCache()
 		self._hasParsed = True
 		return self
 
 	"""
-	Sets the wordlist in a unique list which each element is a list containing
-	all the words with same length that its index
+	Returns the filename of the compiled cache of the wordlist, which depends
+	on whether diacritics are folded
+
+	@return 	cache filename
+	"""
+	def getCacheFilename(self):
+		return self._filename + (CACHE_FOLD_EXT if self._fold else "") + \
+			CACHE_EXT
+
+	"""
+	Loads the parsed wordlist from the compiled cache if it exists and it's
+	fresh, this means, the wordlist file has not changed since the cache was
+	built (checked by its size, modification time and hash)
+
+	The positional letter index is loaded from the cache too, so it's not
+	built again (and it's shared by all processes when memory-mapped)
+
+	@return 	True if the wordlist has been loaded from the cache
+	"""
+	def _loadCache(self):
+		try:
+			header, arrays = binfile.read(self.getCacheFilename(), self._mmap)
+		except (OSError, ValueError):
+			return False
+		if header.get("version") != CACHE_VERSION or \
+			header.get("fold") != self._fold or \
+			not binfile.matchesSignature(self._filename, header["source"]):
+			LOGGER.debug("Wordlist cache %s is stale",self.getCacheFilename())
+			return False
+		self._wordlist = [arrays["len_%d"%i] for i in range(header["lengths"])]
+		self._wordcount = header["wordcount"]
+		self._head = header["head"]
+		self._tail = header["tail"]
+		self._encoding = header["encoding"]
+		self._setAlphabet(header["alphabet"])
+		self._weights = [arrays["weights_%d"%i] for i in
+			range(header["lengths"])] if header["weighted"] else None
+		self._index = WordIndex(self._wordlist, self._alive)
+		self._index.setArrays({name[len("index_"):]:arr for name, arr in
+			arrays.items() if name.startswith("index_")})
+		return True
+
+	"""
+	Stores the parsed wordlist and its positional letter index into the
+	compiled cache, along with the signature of the wordlist file to check it
+	later. Errors writing the cache are ignored, as the cache is just an
+	optimization
+
+	@return 	True if the cache has been written
 	"""
-	def _parse(self):
-		# convert by lengths
-		self._wordlist = [np.array([np.array(list(map(ord,list(w))),
-			dtype=np.uint8)
-			for w in self._wordlist if len(w) == num])
-			for num in set(len(i) for i in self._wordlist)]
-		# check empty sizes
-		i=0
-		while i < len(self._wordlist):
-			if len(self._wordlist[i]) == 0 or len(self._wordlist[i][0]) == i:
-				i+=1
-			elif len(self._wordlist[i][0]) > i:
-				self._wordlist.insert(i,[])
+	def _saveCache(self):
+		try:
+			header = {
+				"version":CACHE_VERSION,
+				"source":binfile.fileSignature(self._filename),
+				"wordcount":self._wordcount,
+				"head":self._head,
+				"tail":self._tail,
+				"fold":self._fold,
+				"encoding":self._encoding,
+				"alphabet":self._alphabet,
+				"weighted":self._weights is not None,
+				"lengths":len(self._wordlist)}
+			arrays = {"len_%d"%i:self._wordlist[i]
+				for i in range(len(self._wordlist))}
+			if self._weights is not None:
+				arrays.update({"weights_%d"%i:self.getWeights(i)
+					for i in range(len(self._wordlist))})
+			if self._index is None:
+				self._index = WordIndex(self._wordlist, self._alive)
+			arrays.update({"index_%s"%name:arr for name, arr in
+				self._index.getArrays().items()})
+			binfile.write(self.getCacheFilename(), header, arrays)
+			return True
+		except OSError as e:
+			LOGGER.debug("Unable to write wordlist cache: %s",e)
+			return False
 
 	"""
 	Returns the name of the file where the wordlist came from
@@ -119,18 +603,428 @@ class WordList(object):
 		return self._wordcount
 
 	"""
-	Returns the wordlist as a list of lists where each sublist contains words
-	whose length is the index of the list in the main list or just a simple
-	list of words, depending on the status of the object
+	Returns the wordlist as a list of matrices where each matrix contains the
+	words whose length is the index of the matrix in the list, a word per row
 
 	WARNING: At least a successful call to read() is necessary
+	WARNING: Matrices loaded from the cache are read-only views
+	WARNING: Removed words are kept in the matrices till they are compacted,
+	use the domains of the index to skip them
 
-	@return 	wordlist
+	@param 		weights 	if True, returns also the weights of the words
+	@return 	wordlist, or tuple (wordlist, list of weights by length) if
+				weights are asked
 	"""
-	def getList(self):
+	def getList(self, weights=False):
 		assert self._hasRead
+		if weights:
+			return self._wordlist, [self.getWeights(length)
+				for length in range(len(self._wordlist))]
 		return self._wordlist
 
+	"""
+	Returns the weights of the words of a length, in the same order as the
+	words in the matrix of that length. Words of wordlists without weights
+	have all the default weight
+
+	WARNING: At least a successful call to read() is necessary
+
+	@param 		length 		length of the words
+	@return 	float array with the weight of each word
+	"""
+	def getWeights(self, length):
+		assert self._hasRead
+		count = len(self._wordlist[length]) if length < len(self._wordlist) \
+			else 0
+		if self._weights is None:
+			return np.full(count, WEIGHT_DEFAULT, dtype=np.float32)
+		return self._weights[length][:count]
+
+	"""
+	Returns if the words of the wordlist have weights
+
+	@return 	True if the wordlist is weighted
+	"""
+	def isWeighted(self):
+		return self._weights is not None
+
+	"""
+	Computes a hash of the contents of the wordlist: its alphabet and the words
+	not removed of each length, in their order. Wordlists read from different
+	files or composed but with the same words have the same hash
+
+	WARNING: At least a successful call to read() is necessary
+
+	@return 	hexadecimal digest string
+	"""
+	def getHash(self):
+		assert self._hasRead
+		digest = hashlib.sha1(self._alphabet.encode("utf-8"))
+		for length, words in enumerate(self._wordlist):
+			if length < len(self._alive) and self._alive[length] is not None:
+				words = words[self._alive[length][:len(words)]]
+			digest.update(np.array([length,len(words)], dtype="<i8").tobytes())
+			digest.update(np.ascontiguousarray(words).tobytes())
+		return digest.hexdigest()
+
+	"""
+	Returns the positional letter index of the parsed words, that gives for
+	each word length, position and letter the mask of the words that match
+
+	WARNING: A successful call to parse() is necessary
+
+	@return 	word index
+	"""
+	def getIndex(self):
+		assert self._hasParsed
+		if self._index is None:
+			self._index = WordIndex(self._wordlist, self._alive)
+		return self._index
+
+	"""
+	Prepares the lists of words by length to be edited, enlarging them to fit
+	the given length if needed
+
+	@param 	length 	length of the words to edit
+	"""
+	def _prepareEdit(self, length):
+		while len(self._wordlist) <= length:
+			self._wordlist.append(np.empty((0,len(self._wordlist)),
+				dtype=np.uint8))
+		if self._weights is not None:
+			self._weights.extend([np.full(len(buffer), WEIGHT_DEFAULT,
+				dtype=np.float32) for buffer in
+				self._wordlist[len(self._weights):]])
+		self._buffers.extend(self._wordlist[len(self._buffers):])
+		self._alive.extend([None for _ in
+			range(len(self._wordlist)-len(self._alive))])
+		self._removed.extend([0 for _ in
+			range(len(self._wordlist)-len(self._removed))])
+
+	"""
+	Adds a word to the wordlist if it's not in it yet, keeping the matrix of
+	its length and the index up to date. The matrix of each length grows by
+	doubling its rows, so adding words takes amortized constant time
+
+	Added words are appended after the words of their length, so they are not
+	sorted by weight till their length is compacted
+
+	WARNING: A successful call to parse() is necessary
+
+	@param 	word 	word to add, as a string or as letter codes
+	@param 	weight 	weight of the word (makes the wordlist weighted if it's
+					not the default one)
+	@raises ValueError 	if the word has new letters and the alphabet is full
+	@return True if the word has been added, False if it was already there
+	"""
+	def addWord(self, word, weight=WEIGHT_DEFAULT):
+		assert self._hasParsed
+		word = self.encode(word, True)
+		length = len(word)
+		if len(self.match(length=length, fixed=dict(enumerate(word)))):
+			return False
+		if weight != WEIGHT_DEFAULT:
+			self._setWeighted()
+		self._appendWords(length, word[np.newaxis], weight)
+		return True
+
+	"""
+	Appends words to the matrix of their length, growing it if it's full or
+	it's read-only (loaded from the cache or shared with other wordlists)
+
+	@param 	length 	length of the words
+	@param 	words 	matrix of letter codes with a word per row
+	@param 	weights weight of the words (one for all or one per word)
+	"""
+	def _appendWords(self, length, words, weights=WEIGHT_DEFAULT):
+		self._prepareEdit(length)
+		count = len(self._wordlist[length])
+		buffer = self._buffers[length]
+		if count + len(words) > len(buffer) or not buffer.flags.writeable:
+			buffer = np.empty((max(count + len(words), count*2, GROW_MIN),
+				length), dtype=np.uint8)
+			buffer[:count] = self._wordlist[length]
+			self._buffers[length] = buffer
+			if self._alive[length] is not None:
+				alive = np.ones(len(buffer), dtype=bool)
+				alive[:count] = self._alive[length][:count]
+				self._alive[length] = alive
+			if self._weights is not None:
+				self._ownWeights(length, len(buffer))
+		buffer[count:count+len(words)] = words
+		if self._weights is not None:
+			self._weights[length][count:count+len(words)] = weights
+		self._wordlist[length] = buffer[:count+len(words)]
+		if self._alive[length] is not None:
+			self._alive[length][count:count+len(words)] = True
+		self._wordcount += len(words)
+		if self._index is not None:
+			self._index.addWords(length, np.arange(count, count+len(words)))
+
+	"""
+	Makes the weights of a length a private writable array, with the given
+	capacity (the current one if not given)
+
+	@param 	length 		length of the words
+	@param 	capacity 	number of words the array must fit
+	"""
+	def _ownWeights(self, length, capacity=None):
+		current = self._weights[length]
+		if capacity is None:
+			if current.flags.writeable:
+				return
+			capacity = len(current)
+		count = min(len(self._wordlist[length]), len(current))
+		weights = np.full(capacity, WEIGHT_DEFAULT, dtype=np.float32)
+		weights[:count] = current[:count]
+		self._weights[length] = weights
+
+	"""
+	Removes a word from the wordlist, marking it as removed (a tombstone) so
+	the matrix of its length doesn't have to be rebuilt. When too many words of
+	a length have been removed, the matrix of that length is compacted
+
+	WARNING: A successful call to parse() is necessary
+
+	@param 	word 	word to remove, as a string or as letter codes
+	@return True if the word has been removed, False if it was not there
+	"""
+	def removeWord(self, word):
+		assert self._hasParsed
+		word = self.encode(word)
+		if word is None:
+			return False
+		length = len(word)
+		rows = self.match(length=length, fixed=dict(enumerate(word)))
+		if not len(rows):
+			return False
+		self._removeRows(length, rows)
+		if self._removed[length] > COMPACT_RATIO*len(self._wordlist[length]):
+			self.compact(length)
+		return True
+
+	"""
+	Marks the words in the given rows of the matrix of their length as removed
+
+	@param 	length 	length of the words
+	@param 	rows 	rows of the words to remove (not removed yet)
+	"""
+	def _removeRows(self, length, rows):
+		self._prepareEdit(length)
+		if self._alive[length] is None:
+			self._alive[length] = np.ones(len(self._buffers[length]),
+				dtype=bool)
+		self.getIndex().removeWords(length, rows)
+		self._alive[length][rows] = False
+		self._removed[length] += len(rows)
+		self._wordcount -= len(rows)
+
+	"""
+	Composes a wordlist from other parsed wordlists: the union of the words of
+	the bases, plus the words of the overlays, minus the words of the
+	exclusions. Words of the overlays already in the bases take the weight of
+	the overlay (if it has weights)
+
+	No file is read and the words are not copied: the matrices of the first
+	base are shared as read-only views, and so is its index (built here for the
+	lengths of the other wordlists, and copied only where it changes). Words
+	added are appended after the words of their length (which copies just the
+	matrices of those lengths) and words excluded are marked as removed, so
+	composing several wordlists over the same base takes little time and memory
+
+	WARNING: The wordlists must have been parsed. Changes in the first base
+	after composing are not seen by the composed wordlist
+
+	@param 	bases 		list of wordlists to join
+	@param 	overlays 	list of wordlists whose words are added
+	@param 	exclusions 	list of wordlists whose words are removed
+	@raises ValueError 	if the wordlists have too many different letters
+	@return new wordlist, already parsed
+	"""
+	@staticmethod
+	def compose(bases, overlays=(), exclusions=()):
+		assert len(bases)
+		assert all(layer._hasParsed for layer in
+			list(bases)+list(overlays)+list(exclusions))
+		base = bases[0]
+		origin = " + ".join([layer.getOrigin() for layer in
+			list(bases)+list(overlays)])
+		if len(exclusions):
+			origin += " - " + " - ".join([layer.getOrigin() for layer in
+				exclusions])
+		wordlist = WordList(origin, cache=False, fold=base._fold)
+		wordlist._hasRead = wordlist._hasParsed = True
+		wordlist._wordcount = base._wordcount
+		wordlist._head = base._head
+		wordlist._tail = base._tail
+		wordlist._encoding = base._encoding
+		wordlist._setAlphabet(base._alphabet)
+		# share the base
+		wordlist._wordlist = []
+		base._prepareEdit(0)
+		for length in range(len(base._wordlist)):
+			words = base._wordlist[length].view()
+			words.flags.writeable = False
+			wordlist._wordlist.append(words)
+			alive = base._alive[length]
+			wordlist._alive.append(None if alive is None else
+				alive[:len(words)].copy())
+			wordlist._removed.append(base._removed[length])
+		wordlist._buffers = list(wordlist._wordlist)
+		if base._weights is not None:
+			wordlist._weights = [base.getWeights(length).view()
+				for length in range(len(base._wordlist))]
+			for weights in wordlist._weights:
+				weights.flags.writeable = False
+		index = base.getIndex()
+		for layer in list(bases[1:])+list(overlays)+list(exclusions):
+			for length in range(min(len(base._wordlist),len(layer._wordlist))):
+				if len(layer._wordlist[length]):
+					index.build(length)
+		wordlist._index = index.derive(wordlist._wordlist, wordlist._alive)
+		# apply the other wordlists
+		for layer in bases[1:]:
+			wordlist._merge(layer, False)
+		for layer in overlays:
+			wordlist._merge(layer, True)
+		for layer in exclusions:
+			wordlist._exclude(layer)
+		return wordlist
+
+	"""
+	Returns the words not removed of another wordlist by length, with the
+	letter codes of this wordlist. Words with letters not in this wordlist are
+	dropped, unless extending its alphabet
+
+	@param 	other 	wordlist to recode
+	@param 	extend 	True to add unknown letters to the alphabet
+	@raises ValueError 	if the alphabet is full and has to be extended
+	@return generator of tuples (length, words, weights)
+	"""
+	def _recode(self, other, extend):
+		recode = np.full(ALPHABET_MAX, -1, dtype=np.int16)
+		for code, letter in enumerate(other._alphabet):
+			letter = self.encode(letter, extend)
+			if letter is not None and len(letter) == 1:
+				recode[code] = letter[0]
+		for length in range(1, len(other._wordlist)):
+			words = recode[other._wordlist[length]]
+			keep = (words >= 0).all(axis=1)
+			if length < len(other._alive) and other._alive[length] is not None:
+				keep &= other._alive[length][:len(keep)]
+			if keep.any():
+				yield length, words[keep].astype(np.uint8), \
+					other.getWeights(length)[keep]
+
+	"""
+	Adds the words of another wordlist that are not in this one yet
+
+	@param 	other 		wordlist to add
+	@param 	override 	True to set the weights of the other wordlist to the
+						words already in this one
+	"""
+	def _merge(self, other, override):
+		if other._weights is not None:
+			self._setWeighted()
+		for length, words, weights in self._recode(other, True):
+			self._prepareEdit(length)
+			found = self.getIndex().find(length, words)
+			if override and other._weights is not None:
+				present = found >= 0
+				self._ownWeights(length)
+				self._weights[length][found[present]] = weights[present]
+			# words repeated in the other wordlist are added once
+			added = np.flatnonzero(found < 0)
+			_, first = np.unique(np.ascontiguousarray(words[added])
+				.view(np.dtype((np.void, length))).ravel(), return_index=True)
+			added = added[np.sort(first)]
+			if len(added):
+				self._appendWords(length, words[added], weights[added])
+
+	"""
+	Removes the words of another wordlist from this one
+
+	@param 	other 	wordlist whose words have to be removed
+	"""
+	def _exclude(self, other):
+		for length, words, _ in self._recode(other, False):
+			# words repeated in this wordlist are found once per pass
+			while True:
+				rows = self.getIndex().find(length, words)
+				rows = np.unique(rows[rows >= 0])
+				if not len(rows):
+					break
+				self._removeRows(length, rows)
+
+	"""
+	Drops the removed words from the matrices, so they don't take space or
+	time anymore, and sorts again the words by weight. Words of a compacted
+	length change their rows, so the index of that length is rebuilt the next
+	time it's used
+
+	@param 	length 	length to compact (None to compact all lengths)
+	"""
+	def compact(self, length=None):
+		lengths = range(len(self._removed)) if length is None else [length]
+		for length in lengths:
+			if length >= len(self._removed):
+				continue
+			count = len(self._wordlist[length])
+			weights = None if self._weights is None else \
+				self._weights[length][:count]
+			unsorted = weights is not None and \
+				bool((weights[:-1] < weights[1:]).any())
+			if not self._removed[length] and not unsorted:
+				continue
+			rows = np.arange(count) if self._alive[length] is None else \
+				np.flatnonzero(self._alive[length][:count])
+			if weights is not None:
+				rows = rows[np.argsort(-weights[rows], kind="stable")]
+				self._weights[length] = weights[rows]
+			self._wordlist[length] = self._buffers[length] = \
+				self._wordlist[length][rows]
+			self._alive[length] = None
+			self._removed[length] = 0
+			if self._index is not None:
+				self._index.invalidate(length)
+
+	"""
+	Finds the words that match a pattern, given either as a string where the
+	wildcard character matches any letter (like "C?T??") or as a length and a
+	dictionary of fixed letters by position (like length=5, fixed={0:'C'}).
+	Uses the positional index, so the query cost depends on the number of
+	candidates and not on the size of the wordlist
+
+	WARNING: A successful call to parse() is necessary
+
+	@param 	pattern 	pattern string to match
+	@param 	length 		length of the words to match if no pattern given
+	@param 	fixed 		dictionary of position -> letter (character or
+						letter code) if no pattern given
+	@param 	mask 		if True, returns a mask instead of the indexes
+	@return sorted indexes of the matching words in the list of words of the
+			length matched (or a boolean mask over that list)
+	"""
+	def match(self, pattern=None, length=None, fixed=None, mask=False):
+		if pattern is not None:
+			pattern = self._normalize(pattern)
+			length = len(pattern)
+			fixed = {pos:letter for pos, letter in enumerate(pattern)
+				if letter != MATCH_WILDCARD}
+		fixed = {pos:self.encode(letter) for pos, letter in
+			(fixed or {}).items()}
+		if any(letter is None for letter in fixed.values()):
+			indexes = np.zeros(0, dtype=np.uint32)
+		else:
+			indexes = self.getIndex().match(length, {pos:letter.item()
+				for pos, letter in fixed.items()})
+		if not mask:
+			return indexes
+		matches = np.zeros(len(self._wordlist[length]) \
+			if length < len(self._wordlist) else 0, dtype=bool)
+		matches[indexes] = True
+		return matches
+
 	"""
 	Returns the wordlist in a human-readable way, by summarizing them into
 	counts per word length
@@ -141,11 +1035,16 @@ class WordList(object):
 		txt =  "WORDLIST specifications:\n"
 		txt += "------------------------------------------------------------\n"
 		txt += "ORIGIN:  %s\n"%(self._filename)
-		txt += "STATUS:  %s, %s\n"%(
+		txt += "STATUS:  %s, %s%s\n"%(
 			"read" if self._hasRead else "not read",
-			"parsed" if self._hasParsed else "not parsed")
+			"parsed" if self._hasParsed else "not parsed",
+			(" (memory-mapped)" if self._mmap else " (from cache)") \
+				if self._fromCache else "")
 		if self._hasRead:
-			txt += "SIZE:    %d words\n"%(self._wordcount)
+			txt += "SIZE:    %d words%s\n"%(self._wordcount,
+				", weighted" if self._weights is not None else "")
+			txt += "LETTERS: %d (%s)%s\n"%(len(self._alphabet),self._alphabet,
+				", diacritics folded" if self._fold else "")
 			txt += "HEAD:    %s\n"%(self._head)
 			txt += "TAIL:    %s\n"%(self._tail)
 		if self._hasParsed:
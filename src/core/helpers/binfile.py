@@ -0,0 +1,173 @@
+# libraries
+import os
+import json
+import struct
+import hashlib
+import numpy as np
+
+# constants
+"""
+Magic bytes that identify a binary file written by this module
+"""
+BINFILE_MAGIC = b"XWBIN\x00\x00\x01"
+
+"""
+Alignment in bytes of the header and every array block, so blocks can be
+memory-mapped directly as numpy arrays
+"""
+BINFILE_ALIGN = 64
+
+"""
+Size of the blocks to read when hashing a file
+"""
+HASH_BLOCK = 1 << 20
+
+"""
+Computes the signature of a file: its size, modification time and (if asked)
+the SHA-1 hash of its contents, in order to detect if derived files are stale
+
+@param 	filename 	file to compute the signature of
+@param 	hashed 		if True, also computes the hash of the contents
+@return dictionary with size, mtime and hash (None if not hashed) keys
+"""
+def fileSignature(filename, hashed=True):
+	stat = os.stat(filename)
+	signature = {"size":stat.st_size, "mtime":stat.st_mtime_ns, "hash":None}
+	if hashed:
+		signature["hash"] = fileHash(filename)
+	return signature
+
+"""
+Computes the SHA-1 hash of the contents of a file
+
+@param 	filename 	file to hash
+@return hexadecimal digest string
+"""
+def fileHash(filename):
+	digest = hashlib.sha1()
+	with open(filename, 'rb') as f:
+		for block in iter(lambda: f.read(HASH_BLOCK), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+"""
+Checks if a file still matches a signature previously taken with
+fileSignature. Size and modification time are checked first, and the hash is
+only computed if the size matches but the modification time does not (the file
+has been touched or copied but maybe not changed)
+
+@param 	filename 	file to check
+@param 	signature 	signature stored previously
+@return True if the file has the same contents as when the signature was taken
+"""
+def matchesSignature(filename, signature):
+	try:
+		current = fileSignature(filename, False)
+	except OSError:
+		return False
+	if current["size"] != signature.get("size"):
+		return False
+	if current["mtime"] == signature.get("mtime"):
+		return True
+	return signature.get("hash") is not None and \
+		fileHash(filename) == signature["hash"]
+
+"""
+Returns the number of padding bytes needed to align the given offset
+
+@param 	offset 	offset to align
+@return bytes to add
+"""
+def _padding(offset):
+	return (BINFILE_ALIGN - offset % BINFILE_ALIGN) % BINFILE_ALIGN
+
+"""
+Writes a binary file containing a JSON header and a set of numpy arrays stored
+as raw aligned blocks. The file is written to a temporary file first and then
+moved, so readers never see a half-written file
+
+@param 	filename 	file to write
+@param 	header 		JSON-serializable dictionary with user information
+@param 	arrays 		dictionary of name -> numpy array to store
+@raises OSError 	if unable to write the file
+"""
+def write(filename, header, arrays):
+	arrays = {name:np.ascontiguousarray(arr) for name, arr in arrays.items()}
+	# compute layout
+	layout = {}
+	offset = 0
+	for name, arr in arrays.items():
+		layout[name] = {"dtype":arr.dtype.str, "shape":list(arr.shape),
+			"offset":offset}
+		offset += arr.nbytes + _padding(arr.nbytes)
+	meta = json.dumps({"header":header, "arrays":layout}).encode("utf-8")
+	start = len(BINFILE_MAGIC) + 8 + len(meta)
+	start += _padding(start)
+	# write
+	tmpname = "%s.%d.tmp"%(filename, os.getpid())
+	try:
+		with open(tmpname, 'wb') as f:
+			f.write(BINFILE_MAGIC)
+			f.write(struct.pack("<Q", len(meta)))
+			f.write(meta)
+			f.write(b"\x00"*(start - f.tell()))
+			for name, arr in arrays.items():
+				f.write(arr.tobytes())
+				f.write(b"\x00"*_padding(arr.nbytes))
+		os.replace(tmpname, filename)
+	finally:
+		if os.path.exists(tmpname):
+			os.remove(tmpname)
+
+"""
+Reads the header of a binary file written with write
+
+@param 	filename 	file to read
+@raises OSError 	if unable to read the file
+@raises ValueError 	if the file is not a valid binary file
+@return tuple (header, layout, data start offset)
+"""
+def readHeader(filename):
+	with open(filename, 'rb') as f:
+		if f.read(len(BINFILE_MAGIC)) != BINFILE_MAGIC:
+			raise ValueError("%s is not a valid binary file"%filename)
+		size = struct.unpack("<Q", f.read(8))[0]
+		meta = json.loads(f.read(size).decode("utf-8"))
+	start = len(BINFILE_MAGIC) + 8 + size
+	start += _padding(start)
+	return meta["header"], meta["arrays"], start
+
+"""
+Reads a binary file written with write, returning its header and arrays
+
+If mmap is set, arrays are read-only memory-mapped views of the file, so
+several processes reading the same file share the same physical pages. If not,
+the file is read at once and arrays are read-only views of the read buffer
+
+@param 	filename 	file to read
+@param 	mmap 		True to memory-map the arrays instead of reading them
+@raises OSError 	if unable to read the file
+@raises ValueError 	if the file is not a valid binary file
+@return tuple (header, dictionary of name -> numpy array)
+"""
+def read(filename, mmap=False):
+	header, layout, start = readHeader(filename)
+	arrays = {}
+	if not mmap:
+		with open(filename, 'rb') as f:
+			f.seek(start)
+			buffer = f.read()
+	for name, info in layout.items():
+		dtype = np.dtype(info["dtype"])
+		shape = tuple(info["shape"])
+		count = int(np.prod(shape, dtype=np.int64))
+		if mmap and count:
+			arrays[name] = np.memmap(filename, dtype=dtype, mode='r',
+				offset=start+info["offset"], shape=shape).view(np.ndarray)
+		elif mmap:
+			arrays[name] = np.empty(shape, dtype=dtype)
+			arrays[name].flags.writeable = False
+		else:
+			arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+				offset=info["offset"]).reshape(shape)
+	return header, arrays
@@ -1,5 +1,7 @@
 from ..algorithms.backtracking import *
+from ..data.wordindex import WordIndex
 import sys
+import numpy as np
 class CrosswordBasicBacktracking(object):
 	"""
 	Class attributes:
@@ -7,10 +9,14 @@ class CrosswordBasicBacktracking(object):
 	@attr 	_domain       domain that each variable can have
 	@attr 	_constraints  constraints the algorithm must apply to get a valid
 	                      solution
+	@attr 	_index        positional letter index of the domain, to find the
+	                      words that fit the letters already assigned
+	@attr 	_fixed        letters fixed in each variable before searching
+	@attr 	_domains      domain of each variable before searching
 	@attr 	_isSearching  protects the algorithm from being called twice
 	                      if the value is true, no more calls are allowed
 	"""
-	__slots__ = ["_domain","_constraints","_navl","_isSearching","_vars_num"]
+	__slots__ = ["_domain","_constraints","_index","_fixed","_domains","_navl","_isSearching","_vars_num"]
 
 	"""
 	Initializes a new backtracking algorithm with the given domain to set into
@@ -18,10 +24,23 @@ class CrosswordBasicBacktracking(object):
 
 	@param 	domain       domain of the variables
 	@param 	constraints  constraints to apply in the problem
-	"""
-	def __init__(self, domain, constraints):
+	@param 	index        positional letter index of the domain (built from
+	                     the domain if not given)
+	@param 	fixed        letters fixed in each variable before searching, as
+	                     lists of (position, letter) tuples (none if not
+	                     given)
+	@param 	domains      domain of each variable before searching, as boolean
+	                     arrays of the words of its length it can have, like
+	                     the ones left by arc consistency (all the words
+	                     with the fixed letters if not given)
+	"""
+	def __init__(self, domain, constraints, index=None, fixed=None,
+		domains=None):
 		self._domain = domain
 		self._constraints = constraints
+		self._index = index if index is not None else WordIndex(domain)
+		self._fixed = fixed
+		self._domains = domains
 		self._isSearching = False
 
 	"""
@@ -39,7 +58,8 @@ class CrosswordBasicBacktracking(object):
 		self._isSearching = True
 		navl = self._sortByConstraintsNumber(self._transformNavl(navl))
 		self._vars_num = len(navl)
-		constraints = [[] for _ in range(len(navl))]
+		constraints = [[] for _ in range(len(navl))] if self._fixed is None \
+			else [list(letters) for letters in self._fixed]
 		avl = [None for _ in range(len(navl))]
 		sol = self.__backtracking(avl,navl,constraints)
 		self._isSearching = False
@@ -93,7 +113,7 @@ class CrosswordBasicBacktracking(object):
 			return avl
 		# Get variable to assign and its domain
 		variable = self._chooseVariableToAssign(navl)
-		variableDomain = self._getDomainForVariable(variable)
+		variableDomain = self._getDomainForVariable(variable, constraints)
 		# Loop over the possibilities of the domain
 		for asignableValue in variableDomain:
 			if self._satisfiesConstraints(constraints, avl, variable, asignableValue):
@@ -146,13 +166,23 @@ class CrosswordBasicBacktracking(object):
 
 	"""
 	Given a variable that must be assigned, returns the domain that the variable
-	can have in order to iterate over its possibilities
+	can have in order to iterate over its possibilities, this means, the words
+	of its length that match the letters already assigned to it by the
+	constraints (and that are in the domain given for the variable, if any)
 
 	@param 	variable		variable that we have to assign
+	@param 	constraints 	dynamic constraints in the current state
 	@return list with the values of the domain that the variable can have
-	"""
-	def _getDomainForVariable(self,variable):
-		return self._domain[variable[1]]
+			(empty if the domain has no words of its length)
+	"""
+	def _getDomainForVariable(self,variable,constraints):
+		length = variable[1][0]
+		if length >= len(self._domain):
+			return np.zeros((0,length), dtype=np.uint8)
+		matches = self._index.match(length, dict(constraints[variable[0]]))
+		if self._domains is not None:
+			matches = matches[self._domains[variable[0]][matches]]
+		return self._domain[length][matches]
 
 	def _updateConstraints(self,constraints, var, value):
 		i = var[0]
@@ -1,7 +1,15 @@
 from ..algorithms.backtracking import *
-from itertools import compress
 import sys
+import heapq
 import numpy as np
+from ..data.wordindex import WordIndex
+
+# constants
+"""
+Times the number of variables the heap of variables can grow to with outdated
+entries before being rebuilt with the current ones
+"""
+HEAP_REBUILD_FACTOR = 4
 
 class CrosswordForwardCheckingBacktracking(object):
 	"""
@@ -10,10 +18,23 @@ class CrosswordForwardCheckingBacktracking(object):
 	@attr 	_domain       domain that each variable can have
 	@attr 	_constraints  constraints the algorithm must apply to get a valid
 	                      solution
+	@attr 	_index        positional letter index of the domain, to filter
+	                      the words that have a letter in a position
+	@attr 	_fixed        letters fixed in each variable before searching
+	@attr 	_domains      domain of each variable before searching
 	@attr 	_isSearching  protects the algorithm from being called twice
 	                      if the value is true, no more calls are allowed
+	@attr 	_sizes        number of words left in the domain of each variable
+	@attr 	_free         number of unassigned variables crossing each
+	                      variable
+	@attr 	_rank         position of each variable in the initial order
+	@attr 	_assigned     whether each variable is assigned
+	@attr 	_heap         heap of (size, -free crossings, rank, variable) to
+	                      choose the next variable, with outdated entries
+	                      skipped when popped and dropped when rebuilt
 	"""
-	__slots__ = ["_domain","_constraints","_navl","_isSearching","_vars_num","_variables"]
+	__slots__ = ["_domain","_constraints","_index","_fixed","_domains","_navl","_isSearching","_vars_num","_variables",
+	"_sizes","_free","_rank","_assigned","_heap"]
 
 	"""
 	Initializes a new backtracking algorithm with the given domain to set into
@@ -21,10 +42,23 @@ class CrosswordForwardCheckingBacktracking(object):
 
 	@param 	domain       domain of the variables
 	@param 	constraints  constraints to apply in the problem
-	"""
-	def __init__(self, domain, constraints):
+	@param 	index        positional letter index of the domain (built from
+	                     the domain if not given)
+	@param 	fixed        letters fixed in each variable before searching, as
+	                     lists of (position, letter) tuples (none if not
+	                     given)
+	@param 	domains      domain of each variable before searching, as boolean
+	                     arrays of the words of its length it can have, like
+	                     the ones left by arc consistency (all the words
+	                     with the fixed letters if not given)
+	"""
+	def __init__(self, domain, constraints, index=None, fixed=None,
+		domains=None):
 		self._domain = domain
 		self._constraints = constraints
+		self._index = index if index is not None else WordIndex(domain)
+		self._fixed = fixed
+		self._domains = domains
 		self._isSearching = False
 
 	"""
@@ -47,9 +81,11 @@ class CrosswordForwardCheckingBacktracking(object):
 		navl = self._sortByConstraintsNumber(self._getNavl())
 		#Reordering the navl in order to speedup the application
 		navl = self._reorderNAVL(navl[1:],[navl[0]],navl[0])
-		constraints = [[] for _ in range(len(navl))]
+		constraints = [[] for _ in range(len(navl))] if self._fixed is None \
+			else [list(letters) for letters in self._fixed]
 		domains = self._getDomains()
 		avl = [None for _ in range(len(navl))]
+		self._prepareHeap(navl, domains)
 		# Call backtracking
 		sol = self.__backtracking(avl, navl, constraints, domains, None)
 		self._isSearching = False
@@ -71,13 +107,22 @@ class CrosswordForwardCheckingBacktracking(object):
 	"""
 	Reads the variables assigned to the object that have to be solved and
 	looks in the domain for the words that fit it each variables length so it
-	generates an all True vector for each variable
+	generates an all True vector for each variable (but for removed words and
+	words that don't have the letters fixed in the variable), or copies the
+	domains given when initializing
 
 	@return 	domains list
 	"""
 	def _getDomains(self):
-		return [np.ones(len(self._domain[var[0]]),dtype=np.bool)
-			for var in self._variables]
+		if self._domains is not None:
+			return [np.array(domain, copy=True) for domain in self._domains]
+		domains = [self._index.getDomain(var[0]) for var in self._variables]
+		if self._fixed is not None:
+			for var, domain, letters in zip(self._variables, domains,
+				self._fixed):
+				for pos, letter in letters:
+					domain &= self._index.getMask(var[0], pos, letter)
+		return domains
 
 	"""
 	Sorts the navl variables according to the number of restrictions they have
@@ -129,20 +174,86 @@ class CrosswordForwardCheckingBacktracking(object):
 
 			return new_navl
 
-	def _nextVarByDomainValuesRemaining(self, navl, domains, prevar):
-		if not prevar:
-			return navl[0]
+	"""
+	Initializes the structures to choose the variables by the number of words
+	left in their domains: the size of each domain, kept up to date when
+	restricting and restoring them, and a heap with the unassigned variables
+
+	@param 	navl 		not assigned variables list, in the initial order
+	@param 	domains 	initial domains of the variables
+	"""
+	def _prepareHeap(self, navl, domains):
+		self._sizes = [int(np.count_nonzero(domain)) for domain in domains]
+		self._free = [len(constraints) for constraints in self._constraints]
+		self._rank = [0 for _ in range(len(navl))]
+		for rank, var in enumerate(navl):
+			self._rank[var[0]] = rank
+		self._assigned = [False for _ in range(len(navl))]
+		self._rebuildHeap()
+
+	"""
+	Builds the heap again with an entry per unassigned variable with its
+	current state, dropping the outdated entries
+	"""
+	def _rebuildHeap(self):
+		self._heap = [(self._sizes[var], -self._free[var], self._rank[var],
+			var) for var in range(len(self._assigned))
+			if not self._assigned[var]]
+		heapq.heapify(self._heap)
+
+	"""
+	Adds the current state of an unassigned variable to the heap, the entries
+	with its previous state become outdated. When there are too many outdated
+	entries, the heap is rebuilt, so its size stays proportional to the
+	number of variables
+
+	@param 	var 	index of the variable
+	"""
+	def _pushVariable(self, var):
+		if self._assigned[var]:
+			return
+		if len(self._heap) >= HEAP_REBUILD_FACTOR*len(self._assigned):
+			self._rebuildHeap()
+		else:
+			heapq.heappush(self._heap, (self._sizes[var], -self._free[var],
+				self._rank[var], var))
 
-		variable = navl[0]
-		minimum_domain_values = np.sum(domains[variable[0]])
+	"""
+	Marks a variable as assigned or unassigned, updating the number of
+	unassigned variables crossing its neighbours
+
+	@param 	var 		index of the variable
+	@param 	assigned 	True if assigned, False if unassigned
+	"""
+	def _setAssigned(self, var, assigned):
+		self._assigned[var] = assigned
+		for const in self._constraints[var]:
+			self._free[const[1]] += -1 if assigned else 1
+			self._pushVariable(const[1])
+		self._pushVariable(var)
+
+	"""
+	Chooses the next variable to assign: the first one of the initial order
+	at the start, and then the one with fewest words left in its domain, and
+	among them, the one crossing more unassigned variables
 
-		for var in navl[1:]:
-			current_domain_values = np.sum(domains[var[0]])
+	Domain sizes are kept up to date instead of being counted, and the heap
+	never grows beyond a few entries per variable, so choosing costs an
+	amortized logarithmic time on the number of variables
 
-			if current_domain_values < minimum_domain_values:
-				variable = var
-				minimum_domain_values = current_domain_values
-		return variable
+	@param 	navl 		not assigned variables list
+	@param 	domains 	current domains
+	@param 	prevar 		previous variable assigned (None at the start)
+	@return variable to assign
+	"""
+	def _nextVarByDomainValuesRemaining(self, navl, domains, prevar):
+		if not prevar:
+			return navl[0]
+		while True:
+			size, free, rank, var = heapq.heappop(self._heap)
+			if not self._assigned[var] and size == self._sizes[var] and \
+				-free == self._free[var]:
+				return (var, self._variables[var][0])
 
 
 	"""
@@ -165,6 +276,7 @@ class CrosswordForwardCheckingBacktracking(object):
 			return avl
 		# Get variable to assign and its domain
 		variable = self._nextVarByDomainValuesRemaining(navl, domains, prevar)
+		self._setAssigned(variable[0], True)
 
 		variableDomain = self._getDomainForVariable(variable, domains)
 		# Loop over the possibilities of the domain
@@ -175,54 +287,83 @@ class CrosswordForwardCheckingBacktracking(object):
 				avl[variable[0]]=asignableValue
 				new_constraints = self._updateConstraints(constraints, variable,
 				asignableValue)
-				new_domains = self._updateDomains(constraints, new_constraints,
-				domains)
-				valid_domains = self._checkDomains(domains)
+				trail = self._updateDomains(constraints, new_constraints,
+				domains, avl)
+				valid_domains = self._checkDomains(domains, trail)
 				if valid_domains:
 					solution = self.__backtracking(avl,
 					self._removeVariableToAssign(navl, variable), constraints,
-					new_domains, variable)
+					domains, variable)
 				if valid_domains and self._isCompleteSolution(solution):
 					return solution
 				else:
 					avl[variable[0]] = None
+					self._restoreDomains(domains, trail)
 					self._removeFromConstraints(new_constraints, constraints)
 
+		self._setAssigned(variable[0], False)
 		return None
 
 	"""
 	Given the current dynamic constraints, the constraints that have just been
-	inserted, and the current domains, returns domains that are restricted
-	according to the inserted constraints
+	inserted, and the current domains, restricts in place the domains of the
+	unassigned variables according to the inserted constraints
+
+	Only the words removed are recorded in a trail, so the domains can be
+	restored when backtracking without copying them at every node
 
 	@param 	constraints 	dynamic constraints in the current state
 	@param 	new_constraints	inserted constraints references with the new
 							assigned value
 	@param 	domains 		current domains to restrict
-	@return list of new domains representing constraints applied
+	@param 	avl 			assigned variables list
+	@return trail, list of (variable, indexes of the words removed) tuples
 	"""
-	def _updateDomains(self, constraints, new_constraints, domains):
-		# New domains to represent constraints
-		new_domains = [np.array(domain,copy=True) for domain in domains]
+	def _updateDomains(self, constraints, new_constraints, domains, avl):
+		trail = []
 		# Apply constraints
 		for constraint_ref in new_constraints:
+			if avl[constraint_ref[0]] is not None:
+				continue
 			constraint = constraints[constraint_ref[0]][constraint_ref[1]]
-			new_domains[constraint_ref[0]] *= np.where(
-				self._domain[self._variables[constraint_ref[0]][0]]
-				[:,constraint[0]] == constraint[1],True,False)
-		return new_domains
+			domain = domains[constraint_ref[0]]
+			removed = np.flatnonzero(domain & ~self._index.getMask(
+				self._variables[constraint_ref[0]][0],constraint[0],
+				constraint[1]))
+			domain[removed] = False
+			trail.append((constraint_ref[0], removed))
+			if len(removed):
+				self._sizes[constraint_ref[0]] -= len(removed)
+				self._pushVariable(constraint_ref[0])
+		return trail
+
+	"""
+	Restores the words removed from the domains, undoing the trail in reverse
+	order
+
+	@param 	domains 		current domains for each variable
+	@param 	trail 			trail returned when restricting the domains
+	"""
+	def _restoreDomains(self, domains, trail):
+		for var, removed in reversed(trail):
+			domains[var][removed] = True
+			if len(removed):
+				self._sizes[var] += len(removed)
+				self._pushVariable(var)
 
 	"""
 	Given the current domains checks if a variable will not be able to assign
-	a value cause it has no compatibilities with the others
+	a value cause it has no compatibilities with the others, looking only at
+	the domains restricted in the trail given
 
 
 	@param 	domains 		current domains for each variable
+	@param 	trail 			trail returned when restricting the domains
 	@return True/False
 	"""
-	def _checkDomains(self, domains):
-		for dom in domains:
-			if not any(dom):
+	def _checkDomains(self, domains, trail):
+		for var, _ in trail:
+			if not domains[var].any():
 				return False
 		return True
 
@@ -266,12 +407,16 @@ class CrosswordForwardCheckingBacktracking(object):
 	Given a variable that must be assigned, returns the domain that the variable
 	can have in order to iterate over its possibilities
 
+	Values are given in the order of the domain, and words of each length are
+	sorted by decreasing weight in weighted wordlists, so the most likely
+	words are tried first
+
 	@param 	variable		variable that we have to assign
 	@return list with the values of the domain that the variable can have
 	"""
 	def _getDomainForVariable(self,variable,domains):
 		#return self._domain[variable[1]]
-		return compress(range(len(domains[variable[0]])),domains[variable[0]])
+		return np.flatnonzero(domains[variable[0]]).tolist()
 
 	def _updateConstraints(self,constraints, var, value):
 		i = var[0]
@@ -2,6 +2,7 @@ from ..algorithms.backtracking import *
 from itertools import compress
 import sys
 import numpy as np
+from ..data.wordindex import WordIndex
 import core.data.constants as constants
 import logging
 import time
@@ -16,13 +17,17 @@ class CrosswordLiveBacktracking(object):
 	@attr 	_domain       domain that each variable can have
 	@attr 	_constraints  constraints the algorithm must apply to get a valid
 	                      solution
+	@attr 	_index        positional letter index of the domain, to filter
+	                      the words that have a letter in a position
+	@attr 	_fixed        letters fixed in each variable before searching
+	@attr 	_domains      domain of each variable before searching
 	@attr 	_isSearching  protects the algorithm from being called twice
 	                      if the value is true, no more calls are allowed
 	@attr 	_variables 	  variables obtained from crossword
 	@attr 	_tries        tries by variable
 	@attr   _totalTries   total number of tries
 	"""
-	__slots__ = ["_domain","_constraints","_isSearching","_variables",
+	__slots__ = ["_domain","_constraints","_index","_fixed","_domains","_isSearching","_variables",
 	"_printer","_tries","_totalTries"]
 
 	"""
@@ -31,11 +36,24 @@ class CrosswordLiveBacktracking(object):
 
 	@param 	domain       domain of the variables
 	@param 	constraints  constraints to apply in the problem
+	@param 	index        positional letter index of the domain (built from
+	                     the domain if not given)
+	@param 	fixed        letters fixed in each variable before searching, as
+	                     lists of (position, letter) tuples (none if not
+	                     given)
+	@param 	domains      domain of each variable before searching, as boolean
+	                     arrays of the words of its length it can have, like
+	                     the ones left by arc consistency (all the words
+	                     with the fixed letters if not given)
 	@param 	printer 	printer
 	"""
-	def __init__(self, domain, constraints, printer):
+	def __init__(self, domain, constraints, printer, index=None, fixed=None,
+		domains=None):
 		self._domain = domain
 		self._constraints = constraints
+		self._index = index if index is not None else WordIndex(domain)
+		self._fixed = fixed
+		self._domains = domains
 		self._printer = printer
 		self._isSearching = False
 
@@ -58,7 +76,8 @@ class CrosswordLiveBacktracking(object):
 		navl = self._sortByConstraintsNumber(self._getNavl())
 		#Reordering the navl in order to speedup the application
 		navl = self._reorderNAVL(navl[1:],[navl[0]],navl[0])
-		constraints = [[] for _ in range(len(navl))]
+		constraints = [[] for _ in range(len(navl))] if self._fixed is None \
+			else [list(letters) for letters in self._fixed]
 		domains = self._getDomains()
 		avl = [None for _ in range(len(navl))]
 		self._tries = np.zeros(len(self._variables),dtype=np.uint32)
@@ -93,13 +112,22 @@ class CrosswordLiveBacktracking(object):
 	"""
 	Reads the variables assigned to the object that have to be solved and
 	looks in the domain for the words that fit it each variables length so it
-	generates an all True vector for each variable
+	generates an all True vector for each variable (but for removed words and
+	words that don't have the letters fixed in the variable), or copies the
+	domains given when initializing
 
 	@return 	domains list
 	"""
 	def _getDomains(self):
-		return [np.ones(len(self._domain[var[0]]),dtype=np.bool)
-			for var in self._variables]
+		if self._domains is not None:
+			return [np.array(domain, copy=True) for domain in self._domains]
+		domains = [self._index.getDomain(var[0]) for var in self._variables]
+		if self._fixed is not None:
+			for var, domain, letters in zip(self._variables, domains,
+				self._fixed):
+				for pos, letter in letters:
+					domain &= self._index.getMask(var[0], pos, letter)
+		return domains
 
 	"""
 	Sorts the navl variables according to the number of restrictions they have
@@ -267,9 +295,9 @@ class CrosswordLiveBacktracking(object):
 		# Apply constraints
 		for constraint_ref in new_constraints:
 			constraint = constraints[constraint_ref[0]][constraint_ref[1]]
-			new_domains[constraint_ref[0]] *= np.where(
-				self._domain[self._variables[constraint_ref[0]][0]]
-				[:,constraint[0]] == constraint[1],True,False)
+			new_domains[constraint_ref[0]] &= self._index.getMask(
+				self._variables[constraint_ref[0]][0],constraint[0],
+				constraint[1])
 		return new_domains
 
 	def _updateDomains2(self, constraints, new_constraints, domains):
@@ -278,9 +306,8 @@ class CrosswordLiveBacktracking(object):
 		# Apply constraints
 		for variable_i in range(len(self._variables)):
 			for constraint in constraints[variable_i]:
-				new_domains[variable_i] *= np.where(
-					self._domain[self._variables[variable_i][0]][:,constraint[0]] ==\
-					constraint[1],True,False)
+				new_domains[variable_i] &= self._index.getMask(
+					self._variables[variable_i][0],constraint[0],constraint[1])
 		return new_domains
 
 	def _checkDomains(self, domains):
@@ -0,0 +1,318 @@
+from collections import deque
+import numpy as np
+from ..data.wordindex import WordIndex
+from ..algorithms.cellletters import CellLetters
+
+class CrosswordMACBacktracking(object):
+	"""
+	Backtracking algorithm maintaining arc consistency (MAC): after each
+	assignment, words are removed from the domains of all the variables (not
+	only the ones crossed by the variable assigned) until every word left has,
+	for each crossing, some word of the crossed variable with the same letter
+
+	The search starts from the domains left by propagating the letters of the
+	cells (CellLetters), and keeps a mask per cell with the letters still
+	possible there. For each variable and position crossed, the algorithm
+	counts how many words of its domain have each letter there. When a count
+	drops to zero, the letter is taken from the mask of the cell, and the words
+	with that letter are removed from the other variables over the cell, which
+	may drop other counts to zero. Letters already taken from the mask are not
+	propagated again, so each crossing is checked with a bitwise operation,
+	and the words removed are taken from the postings of the index, so only
+	the words with the letters lost are visited.
+	Every removal is recorded in a trail, and undone (words, counts and masks)
+	when backtracking
+
+	Class attributes:
+
+	@attr 	_domain       domain that each variable can have
+	@attr 	_constraints  constraints the algorithm must apply to get a valid
+	                      solution
+	@attr 	_index        positional letter index of the domain, to filter
+	                      the words that have a letter in a position
+	@attr 	_fixed        letters fixed in each variable before searching
+	@attr 	_domains      domain of each variable before searching
+	@attr 	_isSearching  protects the algorithm from being called twice
+	                      if the value is true, no more calls are allowed
+	@attr 	_variables    variables being solved
+	@attr 	_letters      number of letter codes counted
+	@attr 	_positions    positions crossed of each variable
+	@attr 	_cells        cell of each position crossed of each variable
+	@attr 	_owners       positions over each cell, as (variable, column of
+	                      the position crossed) tuples
+	@attr 	_masks        mask of the letters still possible in each cell
+	@attr 	_counts       words of the domain of each variable with each letter
+	                      in each position crossed, as matrices (positions
+	                      crossed, letters)
+	@attr 	_sizes        number of words in the domain of each variable
+	@attr 	_degrees      number of crossings of each variable
+	"""
+	__slots__ = ["_domain","_constraints","_index","_fixed","_domains",
+	"_isSearching","_variables","_letters","_positions","_cells","_owners",
+	"_masks","_counts","_sizes","_degrees"]
+
+	"""
+	Initializes a new backtracking algorithm with the given domain to set into
+	the variables
+
+	@param 	domain       domain of the variables
+	@param 	constraints  constraints to apply in the problem
+	@param 	index        positional letter index of the domain (built from
+	                     the domain if not given)
+	@param 	fixed        letters fixed in each variable before searching, as
+	                     lists of (position, letter) tuples (none if not
+	                     given)
+	@param 	domains      domain of each variable before searching, as boolean
+	                     arrays of the words of its length it can have, like
+	                     the ones left by arc consistency (all the words
+	                     with the fixed letters if not given)
+	"""
+	def __init__(self, domain, constraints, index=None, fixed=None,
+		domains=None):
+		self._domain = domain
+		self._constraints = constraints
+		self._index = index if index is not None else WordIndex(domain)
+		self._fixed = fixed
+		self._domains = domains
+		self._isSearching = False
+
+	"""
+	Starts the backtracking algorithm given the unassigned variables that the
+	algorithm will have to fill
+
+	If you call the algorithm while it's already searching, an assertion
+	will raise
+
+	@param 		navl		not assigned variables list that must be filled
+	@return 	assigned variables list or None if no solution could be found
+	"""
+	def __call__(self, navl):
+		assert not self._isSearching
+		self._isSearching = True
+		self._variables = navl
+		cellLetters = CellLetters(self._domain, self._constraints, self._index,
+			self._fixed)
+		domains, masks = cellLetters(navl, self._getDomains())
+		sol = None
+		if masks is not None:
+			self._sizes = np.array([np.count_nonzero(domain) for domain in
+				domains], dtype=np.int64)
+			self._prepareCells(cellLetters.getCells(navl), masks)
+			self._countLetters(domains)
+			sol = self.__backtracking(domains)
+		self._isSearching = False
+		return sol
+
+	"""
+	Reads the variables assigned to the object that have to be solved and
+	looks in the domain for the words that fit it each variables length so it
+	generates an all True vector for each variable (but for removed words and
+	words that don't have the letters fixed in the variable), or copies the
+	domains given when initializing
+
+	@return 	domains list
+	"""
+	def _getDomains(self):
+		if self._domains is not None:
+			return [np.array(domain, copy=True) for domain in self._domains]
+		domains = [self._index.getDomain(var[0]) for var in self._variables]
+		if self._fixed is not None:
+			for var, domain, letters in zip(self._variables, domains,
+				self._fixed):
+				for pos, letter in letters:
+					domain &= self._index.getMask(var[0], pos, letter)
+		return domains
+
+	"""
+	Finds the positions crossed of each variable, the cell of each one, and
+	the positions over each cell. Variables crossing themselves are not
+	propagated, as in forward checking, since their cells ignore those
+	crossings
+
+	@param 	cells 	cell of each position of each variable
+	@param 	masks 	mask of the letters each position of each variable can
+					have, after propagating the letters of the cells
+	"""
+	def _prepareCells(self, cells, masks):
+		self._positions = [np.unique(np.array([constraint[0] for constraint
+			in constraints], dtype=np.int64)) for constraints in
+			self._constraints]
+		self._cells = [cells[var][positions].tolist() for var, positions in
+			enumerate(self._positions)]
+		self._owners = [[] for _ in range(1 + max([int(cells[var].max())
+			for var in range(len(cells)) if len(cells[var])] + [-1]))]
+		self._masks = [0 for _ in range(len(self._owners))]
+		for var, positions in enumerate(self._positions):
+			for column, pos in enumerate(positions.tolist()):
+				cell = self._cells[var][column]
+				self._owners[cell].append((var, column))
+				self._masks[cell] = int(masks[var][pos])
+		self._degrees = np.array([len(constraints) for constraints in
+			self._constraints], dtype=np.int64)
+
+	"""
+	Counts the words of each domain with each letter in each position crossed
+
+	@param 	domains 	current domains of the variables
+	"""
+	def _countLetters(self, domains):
+		self._letters = 1 + max([int(self._domain[length].max()) for length in
+			set(var[0] for var in self._variables)] + [0])
+		self._counts = [self._count(var, np.flatnonzero(domains[var]))
+			for var in range(len(self._variables))]
+
+	"""
+	Counts the words given of a variable with each letter in each position
+	crossed
+
+	@param 	var 	index of the variable
+	@param 	words 	indexes of the words of the variable
+	@return matrix of counts (positions crossed, letters)
+	"""
+	def _count(self, var, words):
+		positions = self._positions[var]
+		letters = self._domain[self._variables[var][0]][words[:,None],
+			positions].astype(np.int64) + np.arange(len(positions)) * \
+			self._letters
+		return np.bincount(letters.ravel(),
+			minlength=len(positions)*self._letters).astype(np.int32)\
+			.reshape((len(positions),self._letters))
+
+	"""
+	Removes words from the domain of a variable, updating its letter counts
+	and recording the removal in the trail. If some letters are left without
+	words in a position crossed, they are taken from the mask of its cell, and
+	the ones still in the mask are queued to be propagated
+
+	@param 	domains 	current domains of the variables
+	@param 	var 		index of the variable
+	@param 	words 		indexes of the words to remove
+	@param 	queue 		queue of (cell, letters taken from its mask, variable,
+						column of the position crossed) to propagate
+	@param 	trail 		trail of (variable, words removed, (cell, previous
+						mask) tuples)
+	"""
+	def _remove(self, domains, var, words, queue, trail):
+		if not len(words):
+			return
+		domains[var][words] = False
+		self._sizes[var] -= len(words)
+		removed = self._count(var, words)
+		self._counts[var] -= removed
+		unsupported = (self._counts[var] == 0) & (removed > 0)
+		changed = []
+		for column in np.flatnonzero(unsupported.any(axis=1)).tolist():
+			cell = self._cells[var][column]
+			lost = self._masks[cell] & sum(1 << letter for letter in
+				np.flatnonzero(unsupported[column]).tolist())
+			if lost:
+				changed.append((cell, self._masks[cell]))
+				self._masks[cell] &= ~lost
+				queue.append((cell, lost, var, column))
+		trail.append((var, words, changed))
+
+	"""
+	Removes the words of the variables over the cells queued that have the
+	letters taken from their masks, until the queue is empty or a domain is
+	left empty
+
+	@param 	domains 	current domains of the variables
+	@param 	queue 		queue of (cell, letters taken from its mask, variable,
+						column of the position crossed) to propagate
+	@param 	trail 		trail of (variable, words removed, (cell, previous
+						mask) tuples)
+	@return True if no domain has been left empty
+	"""
+	def _propagate(self, domains, queue, trail):
+		while queue:
+			cell, lost, var, column = queue.popleft()
+			letters = CellLetters.getLetters(lost)
+			for other, other_column in self._owners[cell]:
+				if other == var and other_column == column:
+					continue
+				length = self._variables[other][0]
+				other_pos = int(self._positions[other][other_column])
+				words = np.concatenate([self._index.match(length,
+					{other_pos: letter}) for letter in letters]).astype(np.intp)
+				words = words[domains[other][words]]
+				self._remove(domains, other, words, queue, trail)
+				if not self._sizes[other]:
+					return False
+		return True
+
+	"""
+	Undoes the removals recorded in the trail after the given mark
+
+	@param 	domains 	current domains of the variables
+	@param 	trail 		trail of (variable, words removed, (cell, previous
+						mask) tuples)
+	@param 	mark 		length of the trail to go back to
+	"""
+	def _restore(self, domains, trail, mark):
+		while len(trail) > mark:
+			var, words, changed = trail.pop()
+			for cell, mask in reversed(changed):
+				self._masks[cell] = mask
+			domains[var][words] = True
+			self._sizes[var] += len(words)
+			self._counts[var] += self._count(var, words)
+
+	"""
+	Chooses the next variable to assign: the one with the fewest words left,
+	and among them, the one with the most crossings
+
+	@param 	assigned 	boolean array of the variables assigned
+	@return index of the variable or None if all of them are assigned
+	"""
+	def _chooseVariableToAssign(self, assigned):
+		if assigned.all():
+			return None
+		sizes = np.where(assigned, np.iinfo(np.int64).max, self._sizes)
+		candidates = np.flatnonzero(sizes == sizes.min())
+		return int(candidates[np.argmax(self._degrees[candidates])])
+
+	"""
+	Searches over the decision tree with an explicit stack, so big crosswords
+	don't reach the recursion limit. Each level of the stack keeps the variable
+	assigned, the words it can have, the next word to try and the length of
+	the trail before assigning it
+
+	Words are tried in the order of the domain, and words of each length are
+	sorted by decreasing weight in weighted wordlists, so the most likely
+	words are tried first
+
+	@param 	domains 	domains of the variables after propagating the
+						letters of the cells
+	@return avl with the solution or None if no solution could be found
+	"""
+	def __backtracking(self, domains):
+		assigned = np.zeros(len(self._variables), dtype=bool)
+		trail = []
+		variable = self._chooseVariableToAssign(assigned)
+		if variable is None:
+			return []
+		stack = [[variable, np.flatnonzero(domains[variable]).tolist(), 0, 0]]
+		while stack:
+			level = stack[-1]
+			variable, values, tried, mark = level
+			self._restore(domains, trail, mark)
+			if tried == len(values):
+				assigned[variable] = False
+				stack.pop()
+				continue
+			level[2] += 1
+			assigned[variable] = True
+			value = values[tried]
+			others = np.flatnonzero(domains[variable])
+			queue = deque()
+			self._remove(domains, variable, others[others != value], queue,
+				trail)
+			if not self._propagate(domains, queue, trail):
+				continue
+			variable = self._chooseVariableToAssign(assigned)
+			if variable is None:
+				return [self._domain[var[0]][np.flatnonzero(domains[index])[0]]
+					for index, var in enumerate(self._variables)]
+			stack.append([variable, np.flatnonzero(domains[variable]).tolist(),
+				0, len(trail)])
+		return None
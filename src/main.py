@@ -7,16 +7,23 @@ import logging
 import platform
 import os
 import random
+import multiprocessing
+import itertools
 
 # Modules
 import core.log
 from core.data.wordlist import *
 from core.data.crossword import *
+from core.data.solutioncache import *
 from core.data.constants import *
 from core.helpers.parse import *
 from core.implements.basic_backtracking import *
 from core.implements.fc_backtracking import *
 from core.implements.live_backtracking import *
+from core.implements.mac_backtracking import *
+from core.algorithms.feasibility import *
+from core.algorithms.arcconsistency import *
+from core.algorithms.cellletters import *
 from cli.arguments.parsers import DEFAULT_PARSER
 from cli.arguments.constants import *
 from cli.printers.crossword import *
@@ -43,7 +50,7 @@ it, while giving some information about it if it's required
 """
 def loadWordlist(origin):
 	LOGGER.info("-> Loading wordlist (from %s)",origin)
-	wordlist = WordList(origin)
+	wordlist = WordList(origin, args.cache, args.mmap, args.fold)
 	if args.timers > 1: 	time_load_wordlist_start = time.time()
 	wordlist.read()
 	if args.timers > 2:
@@ -57,10 +64,34 @@ def loadWordlist(origin):
 	if args.timers > 1:
 		LOGGER.info("--> Loaded in %f seconds",time.time()-\
 		time_load_wordlist_start)
+	if args.overlay or args.exclude:
+		wordlist = composeWordlist(wordlist)
 	if args.show_wordlist:
 		LOGGER.info(wordlist)
 	return wordlist
 
+"""
+Given the wordlist loaded, loads the overlay and exclusion wordlists given in
+the arguments and returns the wordlist composed with them
+
+@param 	wordlist 	base wordlist, already loaded
+@return composed wordlist
+"""
+def composeWordlist(wordlist):
+	layers = {}
+	for origin in (args.overlay or []) + (args.exclude or []):
+		LOGGER.info("-> Loading wordlist (from %s)",origin)
+		layers[origin] = WordList(origin, args.cache, args.mmap, args.fold)\
+			.read().parse()
+	if args.timers > 1: 	time_compose_start = time.time()
+	wordlist = WordList.compose([wordlist],
+		[layers[origin] for origin in args.overlay or []],
+		[layers[origin] for origin in args.exclude or []])
+	if args.timers > 1:
+		LOGGER.info("--> Composed in %f seconds",time.time()-\
+		time_compose_start)
+	return wordlist
+
 """
 Given the origin of the data for the crossword, loads the crossword and returns
 it, while giving some information about it if it's required
@@ -70,9 +101,17 @@ it, while giving some information about it if it's required
 """
 def loadCrossword(origin):
 	crossword = Crossword(origin)
+	for orient, num, word in args.seed or []:
+		crossword.addSeed(orient, num, word)
 	LOGGER.info("-> Loading crossword (from %s)",origin)
 	if args.timers > 1:		time_load_crossword_start = time.time()
-	crossword.read().parse()
+	if not (args.cache and crossword.loadCompiled()):
+		crossword.read().parse()
+		if args.cache:
+			try:
+				crossword.saveCompiled()
+			except OSError as e:
+				LOGGER.debug("Unable to write compiled crossword: %s",e)
 	if args.timers > 1:
 		LOGGER.info("--> Loaded in %f seconds",time.time()-\
 		time_load_crossword_start)
@@ -83,24 +122,222 @@ def loadCrossword(origin):
 """
 Retrieves the algorithm object to use depending on the arguments
 
+@param 	constraints 	constraints of the variables to solve (the ones of the
+						whole crossword by default)
+@param 	fixed 			letters fixed in the variables to solve
+@param 	domains 		domains of the variables to solve
 @return algorithm callable object
 """
-def selectAlgorithm():
+def selectAlgorithm(constraints=None, fixed=None, domains=None):
 	alg = None
-	LOGGER.info("Chose %s algorithm"%args.algorithm)
+	if constraints is None:
+		constraints = crossword.getConstraints()
 	if args.algorithm == ALG_BACKTRACKING_SIMPLE:
 		alg = CrosswordBasicBacktracking(wordlist.getList(),
-			crossword.getConstraints())
+			constraints,wordlist.getIndex(),fixed,domains)
 	elif args.algorithm == ALG_BACKTRACKING_FC:
 		alg = CrosswordForwardCheckingBacktracking(wordlist.getList(),
-			crossword.getConstraints())
+			constraints,wordlist.getIndex(),fixed,domains)
+	elif args.algorithm == ALG_BACKTRACKING_MAC:
+		alg = CrosswordMACBacktracking(wordlist.getList(),
+			constraints,wordlist.getIndex(),fixed,domains)
 	elif args.algorithm == ALG_BACKTRACKING_LIVE:
-		crossword_printer = CrosswordPrinter(crossword,args.frames)
+		crossword_printer = CrosswordPrinter(crossword,args.frames,
+			wordlist.getAlphabet())
 		crossword_printer.setStyle(args.style)
+		domains = showCandidates(crossword_printer,fixed,domains)
 		alg = CrosswordLiveBacktracking(wordlist.getList(),
-			crossword.getConstraints(),crossword_printer)
+			constraints,crossword_printer,wordlist.getIndex(),fixed,domains)
 	return alg
 
+"""
+Propagates the letters each cell of the crossword can have and shows in the
+printer the cells left with a single letter
+
+@param 	printer 	printer of the crossword
+@param 	fixed 		letters fixed in the variables of the crossword
+@param 	domains 	domains of the variables (all the words if None)
+@return domains of the variables after propagating the letters
+"""
+def showCandidates(printer, fixed, domains):
+	domains, candidates = CellLetters(wordlist.getList(),
+		crossword.getConstraints(),wordlist.getIndex(),fixed)(
+		crossword.getVariables(),domains)
+	if candidates is not None:
+		printer.setCandidates(candidates)
+	return domains
+
+"""
+Encodes the letters fixed in the variables of the crossword with the codes of
+the wordlist. Letters not in the wordlist are looked for in the other case
+
+@return list with a list of (position, letter code) tuples per variable, or
+		None if some letter is not in the wordlist
+"""
+def encodeFixedLetters():
+	fixed = []
+	for letters in crossword.getFixedLetters():
+		codes = []
+		for pos, letter in letters:
+			code = wordlist.encode(letter)
+			if code is None or len(code) != 1:
+				code = wordlist.encode(letter.swapcase())
+			if code is None or len(code) != 1:
+				LOGGER.info("Letter %s is not in the wordlist",letter)
+				return None
+			codes.append((pos, int(code[0])))
+		fixed.append(codes)
+	return fixed
+
+"""
+Checks if the crossword can have a solution with the wordlist before searching,
+logging the problems found if it can't
+
+@param 	fixed 	letters fixed in the variables of the crossword
+@return True if no problem has been found
+"""
+def checkFeasibility(fixed):
+	if args.timers > 1:		time_check_start = time.time()
+	problems = FeasibilityChecker(wordlist.getList(),
+		crossword.getConstraints(),wordlist.getIndex(),fixed)(
+		crossword.getVariables())
+	if args.timers > 1:
+		LOGGER.info("--> Checked in %f seconds",time.time()-time_check_start)
+	if problems:
+		LOGGER.info("The crossword can't be solved with the wordlist:")
+	for problem in problems:
+		variable = crossword.getVariableString(problem[1])
+		if problem[0] == PROBLEM_NO_WORDS:
+			LOGGER.info("-> %s: there are no words of %d letters",variable,
+				problem[2])
+		elif problem[0] == PROBLEM_EMPTY_DOMAIN:
+			LOGGER.info("-> %s: there are no words with the letters %s",
+				variable,", ".join(["%s in position %d"%(
+				wordlist.getAlphabet()[letter],pos+1)
+				for pos, letter in problem[2]]))
+		elif problem[0] == PROBLEM_NO_CROSSING_LETTER:
+			LOGGER.info("-> %s, letter %d and %s, letter %d: no letter fits "
+				"both",variable,problem[2]+1,
+				crossword.getVariableString(problem[3]),problem[4]+1)
+	return not problems
+
+"""
+Removes from the domains of the variables the words that can't be part of a
+solution, because no word of some crossed variable has their letter in the
+crossing, until the domains are arc consistent
+
+@param 	fixed 	letters fixed in the variables of the crossword
+@return list with the domain of each variable, or None if some variable is
+		left without words
+"""
+def enforceArcConsistency(fixed):
+	if args.timers > 1:		time_propagate_start = time.time()
+	domains = ArcConsistency(wordlist.getList(),crossword.getConstraints(),
+		wordlist.getIndex(),fixed)(crossword.getVariables())
+	if args.timers > 1:
+		LOGGER.info("--> Propagated in %f seconds",time.time()-\
+		time_propagate_start)
+	for index, domain in enumerate(domains):
+		if not domain.any():
+			LOGGER.info("The crossword can't be solved with the wordlist:")
+			LOGGER.info("-> %s: no word fits the words of the variables it "
+				"crosses",crossword.getVariableString(index))
+			return None
+	if args.timers > 1:
+		LOGGER.info("--> %d words left in the domains of %d variables",
+			sum(int(domain.sum()) for domain in domains),
+			len(domains))
+	return domains
+
+"""
+Solves a part of the crossword that shares no cells with the rest, on its own
+
+@param 	component 	indexes of the variables of the part to solve
+@param 	fixed 		letters fixed in the variables of the part
+@param 	domains 	domains of the variables of the part (None to use all the
+					words)
+@return assigned variables of the part or None if no solution could be found
+"""
+def solveComponent(component, fixed, domains):
+	variables, constraints = crossword.getSubproblem(component)
+	return selectAlgorithm(constraints, fixed, domains)(variables)
+
+"""
+Solves the crossword with the algorithm chosen. Each part of the crossword that
+shares no cells with the rest is solved on its own, so a failure in one part
+doesn't make the algorithm backtrack over the others, and the parts are solved
+in parallel if more than one job is given. The live algorithm prints the whole
+crossword, so it solves it at once
+
+@return assigned variables list or None if no solution could be found
+"""
+def solveCrossword():
+	fixed = encodeFixedLetters()
+	if fixed is None or not checkFeasibility(fixed):
+		return None
+	domains = None
+	if args.arc_consistency:
+		domains = enforceArcConsistency(fixed)
+		if domains is None:
+			return None
+	if args.algorithm == ALG_BACKTRACKING_LIVE:
+		return selectAlgorithm(fixed=fixed,domains=domains)(
+			crossword.getVariables())
+	components = crossword.getComponents()
+	if len(components) == 1:
+		return selectAlgorithm(fixed=fixed,domains=domains)(
+			crossword.getVariables())
+	LOGGER.info("Solving %d independent parts",len(components))
+	# each part gets only the letters and domains of its variables
+	parts = [(component, [fixed[index] for index in component],
+		None if domains is None else [domains[index] for index in component])
+		for component in components]
+	jobs = min(args.jobs, len(components))
+	if jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+		with multiprocessing.get_context("fork").Pool(jobs) as pool:
+			solutions = pool.starmap(solveComponent, parts)
+	else:
+		solutions = itertools.starmap(solveComponent, parts)
+	solution = [None for _ in range(len(crossword.getVariables()))]
+	for component, values in zip(components, solutions):
+		if values is None:
+			return None
+		for index, value in zip(component, values):
+			solution[index] = value
+	return solution
+
+"""
+Solves the crossword, looking first for a solution stored for the same grid
+and wordlist if a directory of solutions is given, and storing the solution
+found there otherwise
+
+@return assigned variables list or None if no solution could be found
+"""
+def solveStored():
+	if args.solutions is None or args.algorithm == ALG_BACKTRACKING_LIVE:
+		return solveCrossword()
+	cache = SolutionCache(args.solutions)
+	structure, words = crossword.getStructureHash(), wordlist.getHash()
+	solution = cache.get(structure, words)
+	if solution is not None:
+		try:
+			valid = crossword.verifySolution(solution, wordlist.getIndex(),
+				encodeFixedLetters())[0]
+		except ValueError:
+			valid = False
+		if valid:
+			LOGGER.info("Found a stored solution for the crossword")
+			return solution
+		LOGGER.info("Stored solution for the crossword is not valid, "+
+			"solving it again")
+	solution = solveCrossword()
+	if solution is not None:
+		try:
+			cache.put(structure, words, solution)
+		except OSError as e:
+			LOGGER.debug("Unable to store the solution: %s",e)
+	return solution
+
 """
 Given the solution returned from the crossword, searches over the internet for
 the definitions of the words appearing in the solution and shows the user the
@@ -115,8 +352,11 @@ def playGame(solution):
 	LOGGER.info("I want to play a game...")
 	session = mwapi.Session('https://ca.wiktionary.org')
 	for word_i in range(len(solution)):
-		word = "".join(list(map(chr,solution[word_i]))).lower()
+		word = wordlist.decode(solution[word_i])
 		var = crossword.getVariableString(word_i)
+		pattern = word[0]+MATCH_WILDCARD*(len(word)-1)
+		word = word.lower()
+		candidates = len(wordlist.match(pattern))
 		resp = session.get(action='query',prop='extracts',titles=word)\
 		["query"]["pages"]
 		pages = list(resp.keys())
@@ -144,7 +384,8 @@ def playGame(solution):
 				definition = random.choice(valid_defs)
 		if definition == "":
 			definition = word + " (no hem trobat cap definició)"
-		LOGGER.info("%s: %s",var,definition)
+		LOGGER.info("%s: %s [%s, %d paraules possibles]",var,definition,
+			pattern,candidates)
 
 """
 Given a solution from the crossword, tries to print it over the screen, or logs
@@ -156,7 +397,7 @@ def showSolution(solution):
 	if solution == None:
 		LOGGER.info("The algorithm hasn't found any valid solution :(")
 	else:
-		printer = CrosswordPrinter(crossword)
+		printer = CrosswordPrinter(crossword,alphabet=wordlist.getAlphabet())
 		printer.setStyle(args.style)
 		if args.solution:
 			if args.play:
@@ -204,13 +445,11 @@ if __name__ == "__main__":
 	else:
 		LOGGER.info("Loaded all data succesfully")
 
-	# Choose algorithm
-	alg = selectAlgorithm()
-
 	# Solve the problem
+	LOGGER.info("Chose %s algorithm"%args.algorithm)
 	LOGGER.info("Started backtracking algorithm")
 	if args.timers > 0: 	time_alg_start = time.time()
-	solution = alg(crossword.getVariables())
+	solution = solveStored()
 	if args.timers > 0:
 		time_alg_end = time.time()
 		LOGGER.info("Ended alg. in %f seconds",